@@ -0,0 +1,204 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from services.cache import TTLCache
+from services.llm import CHAT_MODELS, reply_key, stream_chat
+from services.metrics import llm_latency
+from services.sse import SSE_HEADERS, format_sse
+from services.streaming import coalesce, replay
+
+router = APIRouter(prefix="/api/ai", tags=["ai"])
+logger = logging.getLogger(__name__)
+
+ASSISTANT_SYSTEM_MESSAGE = (
+    "You are the App Studio Pro AI assistant. App Studio Pro builds AI-powered websites, "
+    "apps and automations. Answer visitors' questions helpfully and concisely in a friendly, "
+    "conversational tone suitable for being read aloud."
+)
+
+BATTLE_SYSTEM_MESSAGE = (
+    "You are one of several AI models answering the same prompt side by side. "
+    "Give your best, most useful answer in a few short paragraphs."
+)
+
+BATTLE_MODELS = ["claude", "gpt", "gemini"]
+BATTLE_MODEL_TIMEOUT = float(os.getenv("BATTLE_MODEL_TIMEOUT", "60"))
+
+# Completed replies per (model, normalized conversation); the same demo prompts come up constantly
+reply_cache = TTLCache(
+    maxsize=int(os.getenv("REPLY_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("REPLY_CACHE_TTL", "86400"))
+)
+
+# Cached replies are re-streamed at this pace so the UI looks the same as a live reply
+REPLY_REPLAY_CHUNK_CHARS = int(os.getenv("REPLY_REPLAY_CHUNK_CHARS", "24"))
+REPLY_REPLAY_DELAY = float(os.getenv("REPLY_REPLAY_DELAY", "0.03"))
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+class ChatStreamRequest(BaseModel):
+    messages: List[ChatMessage]
+
+class BattleRequest(BaseModel):
+    prompt: str
+    models: Optional[List[str]] = None
+
+class ReplyTimer:
+    """Measures time to first token and total time of one streamed reply"""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.total: Optional[float] = None
+
+    def token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+            llm_latency.record(f"{self.alias}.first_token", self.first_token)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        llm_latency.record(f"{self.alias}.total", self.total)
+
+    def timings(self) -> Dict:
+        return {
+            "ttft_ms": round(self.first_token * 1000, 1) if self.first_token is not None else None,
+            "total_ms": round(self.total * 1000, 1) if self.total is not None else None
+        }
+
+def open_reply(alias: str, system_message: str, messages: List[dict]) -> Tuple[bool, AsyncIterator[str]]:
+    """Whether the reply is cached, and its text chunks.
+
+    Cache hits are replayed at the configured pace; live replies are streamed
+    from the model and cached once they complete.
+    """
+    key = reply_key(alias, system_message, messages)
+    cached = reply_cache.get(key)
+    if cached is not None:
+        return True, coalesce(replay(cached, REPLY_REPLAY_CHUNK_CHARS, REPLY_REPLAY_DELAY))
+
+    async def live():
+        provider, model = CHAT_MODELS[alias]
+        parts = []
+        async for text in coalesce(stream_chat(provider, model, system_message, messages)):
+            parts.append(text)
+            yield text
+        if parts:
+            reply_cache.set(key, "".join(parts))
+
+    return False, live()
+
+async def chat_events(alias: str, messages: List[dict]):
+    """SSE frames for one streamed reply: {"token"} frames, then {"done"} with timings"""
+    cached, chunks = open_reply(alias, ASSISTANT_SYSTEM_MESSAGE, messages)
+    timer = ReplyTimer(f"{alias}.cached" if cached else alias)
+
+    try:
+        async for text in chunks:
+            timer.token()
+            yield format_sse({"token": text})
+    except Exception as e:
+        logger.error(f"{alias} stream failed: {str(e)}")
+        yield format_sse({"error": "The assistant is unavailable right now", "done": True})
+        return
+
+    timer.finish()
+    yield format_sse({"done": True, "cached": cached, **timer.timings()})
+
+@router.post("/claude/stream")
+async def claude_stream(request: ChatStreamRequest):
+    """Stream a Claude reply to the chat history as Server-Sent Events"""
+    messages = [
+        {"role": message.role, "content": message.content}
+        for message in request.messages
+        if message.role in ("user", "assistant") and message.content.strip()
+    ]
+    if not messages or messages[-1]["role"] != "user":
+        raise HTTPException(status_code=400, detail="The last message must be from the user")
+
+    return StreamingResponse(
+        chat_events("claude", messages),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+async def battle_events(aliases: List[str], prompt: str):
+    """Run every model at once and interleave their frames, tagged by model.
+
+    Each model streams into a shared queue from its own task under its own
+    timeout, so a slow or failing model only ends its own lane.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+    messages = [{"role": "user", "content": prompt}]
+    results: Dict[str, Dict] = {}
+
+    async def fight(alias: str):
+        cached, chunks = open_reply(alias, BATTLE_SYSTEM_MESSAGE, messages)
+        timer = ReplyTimer(f"{alias}.cached" if cached else alias)
+        reply = []
+
+        async def run():
+            try:
+                async for text in chunks:
+                    timer.token()
+                    reply.append(text)
+                    await queue.put({"model": alias, "token": text})
+            finally:
+                await chunks.aclose()
+
+        try:
+            await asyncio.wait_for(run(), timeout=BATTLE_MODEL_TIMEOUT)
+            timer.finish()
+            results[alias] = {"status": "complete", "cached": cached, **timer.timings()}
+            await queue.put({"model": alias, "response": "".join(reply), "cached": cached, **timer.timings()})
+        except asyncio.TimeoutError:
+            logger.warning(f"Battle model {alias} timed out after {BATTLE_MODEL_TIMEOUT}s")
+            results[alias] = {"status": "timeout", **timer.timings()}
+            await queue.put({"model": alias, "error": "Timed out", "partial": "".join(reply)})
+        except Exception as e:
+            logger.error(f"Battle model {alias} failed: {str(e)}")
+            results[alias] = {"status": "failed", **timer.timings()}
+            await queue.put({"model": alias, "error": "Model unavailable"})
+        # Not in a `finally`: once the client is gone this task is cancelled, and
+        # nobody would ever drain a full queue to make room for the sentinel
+        await queue.put(None)
+
+    tasks = [asyncio.create_task(fight(alias)) for alias in aliases]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            frame = await queue.get()
+            if frame is None:
+                remaining -= 1
+                continue
+            yield format_sse(frame)
+        yield format_sse({"done": True, "results": results})
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@router.post("/battle")
+async def battle(request: BattleRequest):
+    """Stream several models' answers to one prompt as a single multiplexed SSE response"""
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt is required")
+
+    aliases = request.models or BATTLE_MODELS
+    unknown = [alias for alias in aliases if alias not in CHAT_MODELS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}")
+
+    return StreamingResponse(
+        battle_events(list(dict.fromkeys(aliases)), request.prompt),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
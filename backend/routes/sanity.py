@@ -1,92 +1,208 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-import httpx
-import os
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import base64
+import binascii
+import hashlib
+import json
 import logging
+import os
+
+from services.cache import SWRCache
+from services.disk_store import DiskStore
+from services.file_response import etag_matches, serve_file
+from services.image_proxy import ASSET_FILENAME_RE, ImageProxy, negotiate_format
+from services.sanity import groq, sanity_client, verify_webhook
+from services.sanity_projections import PROFILE_PATTERN, parse_fields, projection
 
 router = APIRouter(prefix="/api/sanity", tags=["sanity"])
 logger = logging.getLogger(__name__)
 
-class SanityClient:
-    def __init__(self):
-        self.project_id = os.getenv("SANITY_PROJECT_ID")
-        self.token = os.getenv("SANITY_API_TOKEN")
-        self.dataset = os.getenv("SANITY_DATASET", "production")
-        self.api_version = os.getenv("SANITY_API_VERSION", "v2025-02-19")
-        
-        if not self.project_id:
-            logger.warning("SANITY_PROJECT_ID not configured")
-        
-        self.base_url = f"https://{self.project_id}.api.sanity.io/{self.api_version}" if self.project_id else None
-        self.headers = {
-            "Authorization": f"Bearer {self.token}" if self.token else "",
-            "Content-Type": "application/json"
-        }
+# Content changes a few times a week: serve from memory, revalidating in the background
+sanity_cache = SWRCache(
+    maxsize=int(os.getenv("SANITY_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SANITY_CACHE_TTL", "60")),
+    stale_ttl=float(os.getenv("SANITY_CACHE_STALE_TTL", "86400")),
+    # A webhook revalidates every cached page and variant of a type; pace those queries
+    max_refreshes=int(os.getenv("SANITY_CACHE_MAX_REFRESHES", "4"))
+)
+
+# Browser and edge caching of content responses; revalidation is cheap thanks to the ETag
+SANITY_CACHE_CONTROL = os.getenv(
+    "SANITY_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=86400"
+)
+
+# How long reads skip apicdn.sanity.io after a webhook reports a change
+SANITY_CDN_BYPASS_SECONDS = float(os.getenv("SANITY_CDN_BYPASS_SECONDS", "60"))
+
+# Document types each route's results are built from; a webhook for any of them refreshes the route
+BLOG_POST_TYPES = ("blogPost", "author", "category")
+SERVICE_TYPES = ("service",)
+PORTFOLIO_TYPES = ("portfolioPiece",)
+
+# Resized WebP/AVIF variants of Sanity images, linked from content responses as `src`/`srcset`
+image_proxy = ImageProxy(
+    store=DiskStore(
+        directory=os.getenv(
+            "IMAGE_CACHE_DIR",
+            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "images")
+        ),
+        max_bytes=int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+        extension=".img"
+    ),
+    widths=[int(width) for width in os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1920").split(",")],
+    max_source_bytes=int(os.getenv("IMAGE_SOURCE_MAX_BYTES", str(25 * 1024 * 1024))),
+    concurrency=int(os.getenv("IMAGE_ENCODE_CONCURRENCY", "2")),
+    quality={
+        "avif": int(os.getenv("IMAGE_QUALITY_AVIF", "55")),
+        "webp": int(os.getenv("IMAGE_QUALITY_WEBP", "78")),
+        "jpeg": int(os.getenv("IMAGE_QUALITY_JPEG", "82"))
+    },
+    # e.g. https://api.appstudiopro.com; without it content responses carry no `src`/`srcset`
+    base_url=os.getenv("PUBLIC_BACKEND_URL", "")
+)
+
+Rendered = Tuple[bytes, str]
+
+def render_content(data: Any, **extra) -> Rendered:
+    """Serialize a route's {"success", "data", "count", ...extra} body once, with its strong ETag"""
+    body = json.dumps(
+        {"success": True, "data": data, "count": len(data), **extra},
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return body, '"' + hashlib.sha256(body).hexdigest() + '"'
+
+async def cached_content(
+    query: str,
+    params: Dict[str, Any],
+    types: Iterable[str],
+    render: Callable[[Any], Rendered] = render_content
+) -> Rendered:
+    """Run a GROQ query through the stale-while-revalidate cache, tagged with its document types.
+
+    Entries are keyed by the query template and its parameters. The rendered
+    body is what gets cached, so hits skip serialization and hashing. Image
+    proxy links are only added when the backend's public origin is configured:
+    the Host header is client-controlled and, behind a TLS proxy, not https.
+    """
+    async def fetch():
+        data = await sanity_client.fetch(query, params, cdn=True)
+        if image_proxy.base_url:
+            image_proxy.add_sources(data, image_proxy.base_url)
+        return render(data)
     
-    async def fetch(self, query: str):
-        """Execute a GROQ query against Sanity"""
-        if not self.base_url:
-            raise HTTPException(
-                status_code=503,
-                detail="Sanity is not configured. Please add SANITY_PROJECT_ID to environment variables."
-            )
-        
-        url = f"{self.base_url}/data/query/{self.dataset}"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(
-                    url,
-                    params={"query": query},
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()["result"]
-            except httpx.HTTPError as e:
-                logger.error(f"Sanity query failed: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Failed to fetch from Sanity: {str(e)}")
+    key = (query, json.dumps(params, sort_keys=True))
+    return await sanity_cache.get(key, fetch, tags=types)
+
+def content_response(request: Request, content: Rendered) -> Response:
+    """JSON response with ETag and Cache-Control, or a 304 if the client's copy is current"""
+    body, etag = content
+    headers = {"ETag": etag, "Cache-Control": SANITY_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@lru_cache(maxsize=128)
+def blog_posts_query(by_category: bool, after_cursor: bool, fields: str) -> str:
+    """Blog post page query, newest first, ordered on (publishedAt, _id) so that
+    a cursor can resume right after the last post of the previous page"""
+    filters = ['_type == "blogPost"', 'publishedAt <= now()']
+    if by_category:
+        filters.append('$category in categories[]->slug.current')
+    if after_cursor:
+        filters.append('(publishedAt < $afterPublishedAt || (publishedAt == $afterPublishedAt && _id < $afterId))')
+    return groq(f"""*[{' && '.join(filters)}]
+    | order(publishedAt desc, _id desc)[0...$limit] {fields}""")
+
+@lru_cache(maxsize=128)
+def services_query(fields: str) -> str:
+    return groq(f'*[_type == "service"] | order(order asc) {fields}')
+
+@lru_cache(maxsize=128)
+def portfolio_query(fields: str) -> str:
+    return groq(f"""*[_type == "portfolioPiece" && (!$featured || featured == true)]
+    | order(_createdAt desc) {fields}""")
+
+# Sections /bundle can combine, with the document types each is built from
+BUNDLE_SECTIONS = {
+    "services": SERVICE_TYPES,
+    "portfolio": PORTFOLIO_TYPES,
+    "posts": BLOG_POST_TYPES
+}
+
+@lru_cache(maxsize=64)
+def bundle_query(sections: Tuple[str, ...], profile: str, by_category: bool) -> str:
+    """One GROQ object query evaluating each section's list query"""
+    queries = {
+        "services": lambda: services_query(projection("service", profile)),
+        "portfolio": lambda: portfolio_query(projection("portfolioPiece", profile)),
+        "posts": lambda: blog_posts_query(by_category, False, projection("blogPost", profile, (), ("_id", "publishedAt")))
+    }
+    return "{ " + ", ".join(f'"{name}": {queries[name]()}' for name in sections) + " }"
+
+def select_fields(doc_type: str, profile: str, fields: Optional[str], required: Tuple[str, ...] = ("_id",)) -> str:
+    """Projection for the request's profile and `fields=`, or a 400 for unknown fields"""
+    try:
+        return projection(doc_type, profile, parse_fields(fields), required)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def encode_cursor(post: Dict) -> str:
+    raw = json.dumps([post.get("publishedAt"), post.get("_id")], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(publishedAt, _id) of the post a page ends with; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        published_at, doc_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("malformed cursor")
+    if not isinstance(published_at, str) or not isinstance(doc_id, str):
+        raise ValueError("malformed cursor")
+    return published_at, doc_id
+
+def render_page(limit: int) -> Callable[[Any], Rendered]:
+    """Renderer for a page fetched with one extra row, which only signals that
+    another page exists"""
+    def render(posts: Any) -> Rendered:
+        page = posts[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(posts) > limit else None
+        return render_content(page, next_cursor=next_cursor)
+    return render
 
 @router.get("/blog-posts")
 async def get_blog_posts(
-    limit: int = Query(10, le=50),
-    category: Optional[str] = None
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    profile: str = Query("detail", pattern=PROFILE_PATTERN),
+    fields: Optional[str] = None
 ):
-    """Fetch blog posts from Sanity"""
-    sanity = SanityClient()
-    
-    # Build GROQ query
+    """Fetch a page of blog posts from Sanity
+
+    Pass the previous response's `next_cursor` as `cursor` for the next page;
+    it is null on the last page. `profile=card` returns the lean list shape and
+    `fields=` narrows either profile to the named top-level fields.
+    """
+    selection = select_fields("blogPost", profile, fields, required=("_id", "publishedAt"))
+    params: Dict[str, Any] = {"limit": limit + 1}
     if category:
-        query = f'''*[_type == "blogPost" && publishedAt <= now() && "{category}" in categories[]->slug.current] 
-        | order(publishedAt desc)[0..{limit-1}] {{
-            _id,
-            title,
-            slug,
-            excerpt,
-            publishedAt,
-            author->,
-            categories[]->,
-            mainImage {{
-                asset->
-            }}
-        }}'''
-    else:
-        query = f'''*[_type == "blogPost" && publishedAt <= now()] 
-        | order(publishedAt desc)[0..{limit-1}] {{
-            _id,
-            title,
-            slug,
-            excerpt,
-            publishedAt,
-            author->,
-            categories[]->,
-            mainImage {{
-                asset->
-            }}
-        }}'''
+        params["category"] = category
+    if cursor:
+        try:
+            params["afterPublishedAt"], params["afterId"] = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    query = blog_posts_query(bool(category), bool(cursor), selection)
     
     try:
-        posts = await sanity.fetch(query)
-        return {"success": True, "data": posts, "count": len(posts)}
+        content = await cached_content(query, params, BLOG_POST_TYPES, render_page(limit))
+        return content_response(request, content)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -94,25 +210,15 @@ async def get_blog_posts(
         raise HTTPException(status_code=500, detail="Failed to fetch blog posts")
 
 @router.get("/services")
-async def get_services():
+async def get_services(
+    request: Request,
+    profile: str = Query("detail", pattern=PROFILE_PATTERN),
+    fields: Optional[str] = None
+):
     """Fetch services from Sanity"""
-    sanity = SanityClient()
-    
-    query = '''*[_type == "service"] | order(order asc) {
-        _id,
-        title,
-        slug,
-        description,
-        icon {
-            asset->
-        },
-        features[],
-        price
-    }'''
-    
+    query = services_query(select_fields("service", profile, fields))
     try:
-        services = await sanity.fetch(query)
-        return {"success": True, "data": services, "count": len(services)}
+        return content_response(request, await cached_content(query, {}, SERVICE_TYPES))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -120,30 +226,125 @@ async def get_services():
         raise HTTPException(status_code=500, detail="Failed to fetch services")
 
 @router.get("/portfolio")
-async def get_portfolio(featured: bool = Query(False)):
+async def get_portfolio(
+    request: Request,
+    featured: bool = Query(False),
+    profile: str = Query("detail", pattern=PROFILE_PATTERN),
+    fields: Optional[str] = None
+):
     """Fetch portfolio pieces from Sanity"""
-    sanity = SanityClient()
-    
-    filter_condition = "&& featured == true" if featured else ""
-    query = f'''*[_type == "portfolioPiece" {filter_condition}] 
-    | order(_createdAt desc) {{
-        _id,
-        title,
-        slug,
-        description,
-        image {{
-            asset->
-        }},
-        technologies[],
-        featured,
-        projectUrl
-    }}'''
-    
+    query = portfolio_query(select_fields("portfolioPiece", profile, fields))
     try:
-        portfolio = await sanity.fetch(query)
-        return {"success": True, "data": portfolio, "count": len(portfolio)}
+        return content_response(request, await cached_content(query, {"featured": featured}, PORTFOLIO_TYPES))
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"Unexpected error fetching portfolio: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch portfolio")
+
+def render_bundle(limit: int) -> Callable[[Any], Rendered]:
+    """Renderer for a bundle, trimming its posts like `render_page`"""
+    def render(bundle: Any) -> Rendered:
+        data = dict(bundle)
+        next_cursor = None
+        if "posts" in data:
+            posts = data["posts"]
+            data["posts"] = posts[:limit]
+            next_cursor = encode_cursor(posts[limit - 1]) if len(posts) > limit else None
+        return render_content(data, count={name: len(items) for name, items in data.items()}, next_cursor=next_cursor)
+    return render
+
+@router.get("/bundle")
+async def get_bundle(
+    request: Request,
+    include: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    category: Optional[str] = None,
+    featured: bool = Query(False),
+    profile: str = Query("detail", pattern=PROFILE_PATTERN)
+):
+    """Fetch several content lists in one request and one Sanity query
+
+    `include=services,portfolio,posts` picks the sections (all by default).
+    `limit` and `category` apply to posts, `featured` to portfolio, and each
+    section has the same shape as its own route. `next_cursor` continues the
+    posts on /blog-posts.
+    """
+    names = parse_fields(include) or tuple(BUNDLE_SECTIONS)
+    unknown = [name for name in names if name not in BUNDLE_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown bundle sections: {', '.join(unknown)}")
+    sections = tuple(name for name in BUNDLE_SECTIONS if name in names)
+
+    params: Dict[str, Any] = {}
+    if "portfolio" in sections:
+        params["featured"] = featured
+    if "posts" in sections:
+        params["limit"] = limit + 1
+        if category:
+            params["category"] = category
+    query = bundle_query(sections, profile, bool("posts" in sections and category))
+    types = tuple(doc_type for name in sections for doc_type in BUNDLE_SECTIONS[name])
+
+    try:
+        return content_response(request, await cached_content(query, params, types, render_bundle(limit)))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error fetching content bundle: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch content bundle")
+
+@router.get("/images/{filename}")
+async def get_image(request: Request, filename: str, w: Optional[int] = Query(None, ge=1)):
+    """Serve a Sanity image asset scaled down to `w` (snapped to IMAGE_WIDTHS),
+    as AVIF or WebP when the browser's Accept header allows it"""
+    if not ASSET_FILENAME_RE.match(filename):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    fmt = negotiate_format(request.headers.get("accept"))
+    path, size, etag, media_type = await image_proxy.variant(filename, image_proxy.snap_width(w), fmt)
+    # Asset file names are content hashes, so a variant URL never changes
+    return serve_file(
+        request, path, size, etag,
+        media_type=media_type,
+        cache_control="public, max-age=31536000, immutable",
+        extra_headers={"Vary": "Accept"}
+    )
+
+@router.post("/webhook")
+async def sanity_webhook(
+    request: Request,
+    mode: str = Query("revalidate", pattern="^(revalidate|invalidate)$")
+):
+    """Refresh cached content when Sanity reports a document change
+
+    Configure the Sanity webhook with a projection that includes `_type` and the
+    secret from SANITY_WEBHOOK_SECRET. By default cached queries for that type
+    are re-fetched in the background; `?mode=invalidate` drops them instead.
+    """
+    secret = sanity_client.webhook_secret
+    if not secret:
+        raise HTTPException(status_code=503, detail="SANITY_WEBHOOK_SECRET is not configured")
+    
+    body = await request.body()
+    if not verify_webhook(body, request.headers.get("sanity-webhook-signature"), secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body must be JSON")
+    doc_type = payload.get("_type") if isinstance(payload, dict) else None
+    if not doc_type:
+        raise HTTPException(status_code=400, detail="Webhook payload must include _type")
+    
+    # The CDN can lag behind a mutation briefly; re-read from the live API meanwhile
+    sanity_client.bypass_cdn(SANITY_CDN_BYPASS_SECONDS)
+    if mode == "invalidate":
+        affected = sanity_cache.invalidate(doc_type)
+    else:
+        affected = sanity_cache.revalidate(doc_type)
+    
+    operation = request.headers.get("sanity-operation", "change")
+    logger.info(f"Sanity {operation} of {doc_type} {payload.get('_id', '')}: {mode}d {affected} cached queries")
+    return {"success": True, "type": doc_type, "mode": mode, "affected": affected}
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Sanity payload benchmark
+Fetches each /api/sanity content route once per projection profile and reports
+the response size, raw and gzipped, so the `card` and `detail` shapes can be
+compared against real content.
+
+    python sanity_payload_benchmark.py
+    python sanity_payload_benchmark.py --url http://localhost:8001 --limit 20 --fields title,slug
+"""
+
+import argparse
+import gzip
+import os
+import sys
+
+import httpx
+from dotenv import load_dotenv
+
+from services.sanity_projections import PROFILES
+
+ROUTES = {
+    "blog-posts": "blogPost",
+    "services": "service",
+    "portfolio": "portfolioPiece"
+}
+
+
+def main() -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Compare Sanity route payload sizes per projection profile")
+    parser.add_argument("routes", nargs="*", default=list(ROUTES), help=f"routes to measure ({', '.join(ROUTES)})")
+    parser.add_argument("--url", default=os.getenv("BACKEND_URL", "http://localhost:8001"))
+    parser.add_argument("--limit", type=int, default=10, help="blog posts per page")
+    parser.add_argument("--fields", help="also measure each profile narrowed to these fields")
+    args = parser.parse_args()
+    unknown = [route for route in args.routes if route not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    base = f"{args.url.rstrip('/')}/api/sanity"
+    failures = 0
+    print(f"{'route':<12} {'profile':<20} {'items':>6} {'bytes':>10} {'gzip':>8} {'vs detail':>10}")
+    with httpx.Client(timeout=30.0) as client:
+        for route in args.routes:
+            detail_size = None
+            variants = [(profile, None) for profile in ("detail", "card")]
+            if args.fields:
+                variants += [(profile, args.fields) for profile in PROFILES[ROUTES[route]]]
+            for profile, fields in variants:
+                params = {"profile": profile}
+                if fields:
+                    params["fields"] = fields
+                if route == "blog-posts":
+                    params["limit"] = args.limit
+                response = client.get(f"{base}/{route}", params=params, headers={"Accept-Encoding": "identity"})
+                label = f"{profile}[{fields}]" if fields else profile
+                if response.status_code != 200:
+                    failures += 1
+                    print(f"❌ {route:<10} {label:<20} {response.status_code} {response.text[:80]}")
+                    continue
+
+                size = len(response.content)
+                detail_size = size if profile == "detail" and not fields else detail_size
+                ratio = f"{size / detail_size:.0%}" if detail_size else "-"
+                print(f"{route:<12} {label:<20} {response.json()['count']:>6} {size:>10} "
+                      f"{len(gzip.compress(response.content)):>8} {ratio:>10}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
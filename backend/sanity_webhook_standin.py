@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Sanity webhook stand-in
+Posts signed sample document-change payloads to /api/sanity/webhook, the way
+Sanity does, so cache invalidation can be exercised without a Sanity project.
+
+    SANITY_WEBHOOK_SECRET=dev-secret python sanity_webhook_standin.py blogPost service
+    python sanity_webhook_standin.py --url http://localhost:8001 --mode invalidate portfolioPiece
+"""
+
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from dotenv import load_dotenv
+
+from services.sanity import sign_webhook
+
+SAMPLE_DOCUMENTS = {
+    "blogPost": {"title": "Sample post", "slug": {"current": "sample-post"}},
+    "service": {"title": "Sample service", "slug": {"current": "sample-service"}},
+    "portfolioPiece": {"title": "Sample project", "slug": {"current": "sample-project"}, "featured": True},
+    "author": {"name": "Sample author"},
+    "category": {"title": "Sample category", "slug": {"current": "sample-category"}}
+}
+
+
+def sample_payload(doc_type: str) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "_id": f"{doc_type}-{uuid.uuid4().hex[:8]}",
+        "_type": doc_type,
+        "_rev": uuid.uuid4().hex[:12],
+        "_updatedAt": now,
+        **SAMPLE_DOCUMENTS.get(doc_type, {})
+    }
+
+
+def main() -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Post signed sample Sanity webhooks")
+    parser.add_argument("types", nargs="*", default=list(SAMPLE_DOCUMENTS), help="document _type values to send")
+    parser.add_argument("--url", default=os.getenv("BACKEND_URL", "http://localhost:8001"))
+    parser.add_argument("--secret", default=os.getenv("SANITY_WEBHOOK_SECRET"))
+    parser.add_argument("--mode", choices=["revalidate", "invalidate"], default="revalidate")
+    parser.add_argument("--operation", choices=["create", "update", "delete"], default="update")
+    parser.add_argument("--bad-signature", action="store_true", help="sign with the wrong secret (expect 401)")
+    args = parser.parse_args()
+
+    if not args.secret:
+        print("❌ Set SANITY_WEBHOOK_SECRET or pass --secret")
+        return 1
+
+    endpoint = f"{args.url.rstrip('/')}/api/sanity/webhook"
+    failures = 0
+    with httpx.Client(timeout=10.0) as client:
+        for doc_type in args.types:
+            body = json.dumps(sample_payload(doc_type)).encode("utf-8")
+            secret = args.secret + "-wrong" if args.bad_signature else args.secret
+            response = client.post(
+                endpoint,
+                params={"mode": args.mode},
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    "sanity-webhook-signature": sign_webhook(body, secret),
+                    "sanity-operation": args.operation
+                }
+            )
+            expected = 401 if args.bad_signature else 200
+            ok = response.status_code == expected
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {doc_type}: {response.status_code} {response.text}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,92 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import asyncio
 from datetime import datetime
 import json
 import base64
-from bs4 import BeautifulSoup
-import requests
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from emergentintegrations.llm.openai.image_generation import OpenAIImageGeneration
+import hashlib
+import codecs
+from urllib.parse import urlsplit
 
 # Import route modules
 from routes.contact import router as contact_router
 from routes.newsletter import router as newsletter_router
-from routes.sanity import router as sanity_router
+from routes.sanity import router as sanity_router, image_proxy, sanity_cache
+from routes.ai import router as ai_router, reply_cache
+from services.fetcher import FetchEngine
+from services.cache import TTLCache
+from services.file_response import serve_file
+from services.html_signals import SignalExtractor
+from services.jobs import Job, JobQueue
+from services.json_stream import FieldCallback, JSONObjectStream
+from services.llm import llm_pool, stream_chat
+from services.metrics import llm_latency, llm_tokens
+from services.disk_store import DiskStore
+from services.prompt_budget import PromptFields, count_tokens
+from services.sanity import sanity_client
+from services.singleflight import ProgressCallback, SingleFlight
+from services.slots import KeyedSlots
+from services.sse import SSE_HEADERS, format_sse
+from services.urls import canonicalize_url, ensure_scheme
 
 load_dotenv()
 
+fetch_engine = FetchEngine()
+
+# Pages larger than this are cut off; the signals we need are almost always near the top
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Finished analyses keyed by canonical URL, so resubmits and demos skip the whole pipeline
+analysis_cache = TTLCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+)
+
+mockup_store = DiskStore(
+    directory=os.getenv("MOCKUP_STORE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "mockups")),
+    max_bytes=int(os.getenv("MOCKUP_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+)
+
+MOCKUP_MODEL = "gpt-image-1"
+
+def prompt_key(prompt: str, model: str) -> str:
+    """Content address for an image prompt.
+
+    Case and runs of whitespace are folded first so prompts that differ only in
+    formatting share one image.
+    """
+    normalized = ' '.join(prompt.lower().split())
+    return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+
+# Token budget for the page text (title, meta description, headings) in the analyzer prompt
+analysis_prompt_fields = PromptFields(budget=int(os.getenv("ANALYSIS_PROMPT_BUDGET", "400")))
+ANALYSIS_SYSTEM_MESSAGE = "You are a website analysis expert. Respond only with valid JSON."
+
+# Concurrent analyses of the same canonical URL share one pipeline run
+analysis_flights = SingleFlight()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await fetch_engine.start()
+    await llm_pool.start()
+    await sanity_client.start()
+    mockup_store.load()
+    image_proxy.store.load()
+    await analysis_jobs.start()
     print("✓ FastAPI application started")
     print("✓ Sanity CMS integration ready (configure SANITY_PROJECT_ID and SANITY_API_TOKEN)")
     print("✓ Resend email integration ready (configure RESEND_API_KEY)")
     yield
+    await analysis_jobs.stop()
+    await llm_pool.aclose()
+    await sanity_client.aclose()
+    await fetch_engine.aclose()
     print("✓ FastAPI application shutdown")
 
 app = FastAPI(lifespan=lifespan)
@@ -44,11 +104,21 @@ app.add_middleware(
 app.include_router(contact_router)
 app.include_router(newsletter_router)
 app.include_router(sanity_router)
+app.include_router(ai_router)
 
 # Removed serialize_doc function - no longer using MongoDB
 
 class AnalyzeRequest(BaseModel):
     url: str
+    force_refresh: bool = False
+    # Legacy: also return the mockup inline as base64 `mockup_image`
+    include_image_data: bool = False
+
+class BatchAnalyzeRequest(BaseModel):
+    urls: List[str]
+    include_mockups: bool = False
+    concurrency: Optional[int] = None
+    per_domain: Optional[int] = None
 
 class ConsultationRequest(BaseModel):
     name: str
@@ -89,68 +159,55 @@ async def health():
         }
     }
 
-def scrape_website(url: str) -> Dict:
-    """Scrape website and extract key information"""
+async def scrape_website(url: str) -> Dict:
+    """Scrape website and extract key information
+
+    The body is streamed into the extractor and the download stops at
+    SCRAPE_MAX_BYTES. The analyzer needs link and image counts, which are only
+    final at the end of the document, so there is no earlier cut-off.
+    """
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        data = {
-            'url': url,
-            'title': soup.title.string if soup.title else 'No title',
-            'meta_description': '',
-            'h1_tags': [],
-            'h2_tags': [],
-            'has_viewport': False,
-            'has_canonical': False,
-            'og_image': '',
-            'link_count': 0,
-            'image_count': 0,
-            'has_nav': False,
-            'has_footer': False,
-            'has_form': False
-        }
-        
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            data['meta_description'] = meta_desc.get('content', '')
-        
-        data['h1_tags'] = [h1.get_text(strip=True) for h1 in soup.find_all('h1')[:3]]
-        data['h2_tags'] = [h2.get_text(strip=True) for h2 in soup.find_all('h2')[:5]]
-        
-        viewport = soup.find('meta', attrs={'name': 'viewport'})
-        data['has_viewport'] = viewport is not None
-        
-        canonical = soup.find('link', attrs={'rel': 'canonical'})
-        data['has_canonical'] = canonical is not None
-        
-        og_img = soup.find('meta', attrs={'property': 'og:image'})
-        if og_img:
-            data['og_image'] = og_img.get('content', '')
-        
-        data['link_count'] = len(soup.find_all('a'))
-        data['image_count'] = len(soup.find_all('img'))
-        data['has_nav'] = soup.find('nav') is not None
-        data['has_footer'] = soup.find('footer') is not None
-        data['has_form'] = soup.find('form') is not None
+        async with fetch_engine.stream(url, headers=headers) as response:
+            response.raise_for_status()
+            
+            extractor = SignalExtractor(url)
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            bytes_read = 0
+            truncated = False
+            
+            async for chunk in response.aiter_bytes():
+                remaining = SCRAPE_MAX_BYTES - bytes_read
+                if len(chunk) > remaining:
+                    chunk = chunk[:remaining]
+                    truncated = True
+                bytes_read += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if truncated:
+                    break
+            else:
+                extractor.feed(decoder.decode(b'', final=True))
         
+        extractor.close()
+        data = extractor.data
+        data['bytes_read'] = bytes_read
+        data['truncated'] = truncated
         return data
         
     except Exception as e:
         raise Exception(f"Scraping failed: {str(e)}")
 
-async def analyze_with_claude(scraped_data: Dict) -> Dict:
-    """Analyze website data with Claude AI"""
-    api_key = os.getenv("EMERGENT_LLM_KEY")
-    if not api_key:
-        raise ValueError("EMERGENT_LLM_KEY not found")
-    
+async def analyze_with_claude(scraped_data: Dict, on_field: Optional[FieldCallback] = None) -> Dict:
+    """Analyze website data with Claude AI
+
+    The reply is streamed and parsed as it arrives; `on_field`, when given, is
+    awaited with each top-level key and value as soon as it is complete.
+    Keys are requested scores first and redesign_description before the lists.
+    """
+    fields = analysis_prompt_fields.fit(scraped_data)
     prompt = f"""Analyze this website data and provide a JSON response with this exact structure:
 {{
   "business_type": "one of: ecommerce, saas, local_business, professional_services, content, nonprofit, portfolio, other",
@@ -159,19 +216,19 @@ async def analyze_with_claude(scraped_data: Dict) -> Dict:
   "ux_score": 0-100 (rate navigation, structure, usability),
   "seo_score": 0-100 (rate meta tags, viewport, structure),
   "exposure_score": 0-100 (estimate based on SEO quality and content),
+  "redesign_description": "detailed 2-3 sentence description of recommended homepage redesign",
   "ai_assistants": ["list 2-3 AI assistant types that would help this business"],
   "funnel_recommendations": ["list 2-3 conversion funnel improvements"],
   "design_improvements": ["list 3 specific visual/UX improvements"],
-  "seo_improvements": ["list 2-3 SEO recommendations"],
-  "redesign_description": "detailed 2-3 sentence description of recommended homepage redesign"
+  "seo_improvements": ["list 2-3 SEO recommendations"]
 }}
 
 Website Data:
 - URL: {scraped_data.get('url')}
-- Title: {scraped_data.get('title', 'N/A')}
-- Meta Description: {scraped_data.get('meta_description', 'N/A')}
-- H1 Tags: {', '.join(scraped_data.get('h1_tags', []))}
-- H2 Tags: {', '.join(scraped_data.get('h2_tags', []))}
+- Title: {fields['title']}
+- Meta Description: {fields['meta_description']}
+- H1 Tags: {', '.join(fields['h1_tags'])}
+- H2 Tags: {', '.join(fields['h2_tags'])}
 - Has Navigation: {scraped_data.get('has_nav', False)}
 - Has Footer: {scraped_data.get('has_footer', False)}
 - Has Forms: {scraped_data.get('has_form', False)}
@@ -182,30 +239,34 @@ Website Data:
 
 Provide ONLY the JSON response."""
 
-    chat = LlmChat(
-        api_key=api_key,
-        session_id="analyzer-" + str(datetime.now().timestamp()),
-        system_message="You are a website analysis expert. Respond only with valid JSON."
-    ).with_model("anthropic", "claude-4-sonnet-20250514")
-    
-    response = await chat.send_message(UserMessage(text=prompt))
+    parser = JSONObjectStream()
+    reply = []
+    chunks = stream_chat(
+        "anthropic",
+        "claude-4-sonnet-20250514",
+        ANALYSIS_SYSTEM_MESSAGE,
+        [{"role": "user", "content": prompt}]
+    )
+    try:
+        async for chunk in chunks:
+            reply.append(chunk)
+            for key, value in parser.feed(chunk):
+                if on_field:
+                    await on_field(key, value)
+            if parser.done:
+                break
+    finally:
+        await chunks.aclose()
     
-    if "```json" in response:
-        json_str = response.split("```json")[1].split("```")[0].strip()
-    elif "```" in response:
-        json_str = response.split("```")[1].split("```")[0].strip()
-    else:
-        json_str = response.strip()
+    llm_tokens.record("analysis.input", count_tokens(ANALYSIS_SYSTEM_MESSAGE) + count_tokens(prompt))
+    llm_tokens.record("analysis.output", count_tokens(''.join(reply)))
     
-    analysis = json.loads(json_str)
-    return analysis
+    if not parser.done:
+        raise ValueError("Analysis reply did not contain a complete JSON object")
+    return parser.result
 
 async def generate_mockup_image(redesign_description: str, business_type: str) -> str:
-    """Generate redesigned website mockup using OpenAI"""
-    api_key = os.getenv("EMERGENT_LLM_KEY")
-    if not api_key:
-        raise ValueError("EMERGENT_LLM_KEY not found")
-    
+    """Generate redesigned website mockup using OpenAI; returns its mockup store ID"""
     prompt = f"""Professional modern website homepage design:
 
 Business Type: {business_type}
@@ -223,55 +284,343 @@ Style Guidelines:
 
 Overall style: Corporate, professional, trustworthy, modern, clean, data-driven"""
     
-    image_gen = OpenAIImageGeneration(api_key=api_key)
-    images = await image_gen.generate_images(
-        prompt=prompt,
-        model="gpt-image-1",
-        number_of_images=1
-    )
+    key = prompt_key(prompt, MOCKUP_MODEL)
+    if not await mockup_store.lookup(key):
+        images = await llm_pool.image_client().generate_images(
+            prompt=prompt,
+            model=MOCKUP_MODEL,
+            number_of_images=1
+        )
+        
+        if not images or len(images) == 0:
+            raise Exception("No images generated")
+        
+        await mockup_store.put(key, images[0])
+    
+    return key
+
+def mockup_url(mockup_id: str) -> str:
+    return f"/api/mockups/{mockup_id}.png"
+
+async def with_inline_image(payload: Dict) -> Dict:
+    """Add the legacy base64 `mockup_image` field for clients that opt in"""
+    image = await mockup_store.get(payload["mockup_id"])
+    if image is None:
+        return payload
+    return {**payload, "mockup_image": base64.b64encode(image).decode('utf-8')}
+
+SCORE_WEIGHTS = {
+    "visual_score": 0.25,
+    "ux_score": 0.25,
+    "seo_score": 0.30,
+    "exposure_score": 0.20
+}
+
+def overall_score_of(analysis: Dict) -> float:
+    return round(sum(analysis.get(key, 50) * weight for key, weight in SCORE_WEIGHTS.items()), 1)
+
+async def run_analysis(
+    url: str,
+    progress: Optional[ProgressCallback] = None,
+    include_mockup: bool = True
+) -> Dict:
+    """Scrape, analyze and mock up a site; returns the /api/analyze result
+
+    `progress`, when given, is awaited with each stage's payload as soon as it
+    exists: "scraped", "scored" (the four scores, mid-reply), "analyzed" (full
+    analysis), then "mockup". Image generation starts as soon as the reply's
+    redesign_description is complete, while the recommendations still stream.
+    With `include_mockup=False` the image stage is skipped and its fields are None.
+    """
+    scraped_data = await scrape_website(url)
+    if progress:
+        await progress("scraped", {"url": url, "scraped_data": scraped_data})
+    
+    scores: Dict = {}
+    partial: Dict = {}
+    mockup_task: Optional[asyncio.Task] = None
+    
+    async def on_field(key: str, value):
+        nonlocal mockup_task
+        partial[key] = value
+        if key in SCORE_WEIGHTS:
+            scores[key] = value
+            if len(scores) == len(SCORE_WEIGHTS) and progress:
+                await progress("scored", {"scores": dict(scores), "overall_score": overall_score_of(scores)})
+        elif key == "redesign_description" and include_mockup and mockup_task is None:
+            mockup_task = asyncio.create_task(
+                generate_mockup_image(value, partial.get('business_type', 'business'))
+            )
+    
+    try:
+        analysis = await analyze_with_claude(scraped_data, on_field)
+    except BaseException:
+        if mockup_task:
+            mockup_task.cancel()
+        raise
+    
+    overall_score = overall_score_of(analysis)
+    if progress:
+        await progress("analyzed", {"analysis": analysis, "overall_score": overall_score})
+    
+    mockup_id = None
+    if include_mockup:
+        if mockup_task is None:
+            mockup_id = await generate_mockup_image(
+                analysis.get('redesign_description', ''),
+                analysis.get('business_type', 'business')
+            )
+        else:
+            mockup_id = await mockup_task
+        if progress:
+            await progress("mockup", {"mockup_id": mockup_id, "mockup_url": mockup_url(mockup_id)})
     
-    if not images or len(images) == 0:
-        raise Exception("No images generated")
+    return {
+        "url": url,
+        "scraped_data": scraped_data,
+        "analysis": analysis,
+        "overall_score": overall_score,
+        "mockup_id": mockup_id,
+        "mockup_url": mockup_url(mockup_id) if mockup_id else None,
+        "analyzed_at": datetime.utcnow().isoformat()
+    }
+
+async def run_analysis_shared(url: str, progress: Optional[ProgressCallback] = None) -> Dict:
+    """run_analysis coalesced on the canonical URL, caching the result once"""
+    cache_key = canonicalize_url(url)
+    
+    async def pipeline(broadcast: ProgressCallback) -> Dict:
+        result = await run_analysis(url, broadcast)
+        analysis_cache.set(cache_key, result)
+        return result
+    
+    return await analysis_flights.run(cache_key, pipeline, progress)
+
+def site_url(raw_url: str) -> Tuple[str, str]:
+    """URL to analyze and its cache key, or a 400 when `raw_url` cannot be parsed"""
+    url = ensure_scheme(raw_url)
+    try:
+        return url, canonicalize_url(url)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid URL: {raw_url}")
+
+# Job status while each stage's successor is running
+JOB_STAGE_STATUS = {
+    "scraped": "analyzing",
+    "scored": "analyzing",
+    "analyzed": "generating_mockup",
+    "mockup": "finalizing"
+}
+
+async def run_analysis_job(job: Job):
+    """Job handler: runs the pipeline, publishing each stage on the job"""
+    url = job.payload["url"]
+    
+    async def progress(stage: str, payload: Dict):
+        job.update(JOB_STAGE_STATUS[stage], **payload)
     
-    image_base64 = base64.b64encode(images[0]).decode('utf-8')
-    return image_base64
+    job.update("scraping")
+    result = await run_analysis_shared(url, progress)
+    job.update("complete", **result, cached=False)
+
+analysis_jobs = JobQueue(
+    run_analysis_job,
+    workers=int(os.getenv("ANALYSIS_JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("ANALYSIS_JOB_QUEUE_SIZE", "100")),
+    ttl=float(os.getenv("ANALYSIS_JOB_TTL", "3600"))
+)
 
 @app.post("/api/analyze")
 async def analyze_website(request: AnalyzeRequest):
     """Complete website analysis"""
+    url, cache_key = site_url(request.url)
     try:
-        url = request.url
-        if not url.startswith('http'):
-            url = 'https://' + url
+        if not request.force_refresh:
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                result = {**cached, "cached": True}
+                return await with_inline_image(result) if request.include_image_data else result
         
-        scraped_data = scrape_website(url)
-        analysis = await analyze_with_claude(scraped_data)
+        result = await run_analysis_shared(url)
         
-        overall_score = (
-            analysis.get('visual_score', 50) * 0.25 +
-            analysis.get('ux_score', 50) * 0.25 +
-            analysis.get('seo_score', 50) * 0.30 +
-            analysis.get('exposure_score', 50) * 0.20
-        )
+        result = {**result, "cached": False}
+        return await with_inline_image(result) if request.include_image_data else result
         
-        mockup_image = await generate_mockup_image(
-            analysis.get('redesign_description', ''),
-            analysis.get('business_type', 'business')
-        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def result_stages(result: Dict) -> List[Dict]:
+    """Split a finished analysis into the events /api/analyze/stream emits"""
+    return [
+        {"stage": "scraped", "url": result["url"], "scraped_data": result["scraped_data"]},
+        {
+            "stage": "scored",
+            "scores": {key: result["analysis"].get(key, 50) for key in SCORE_WEIGHTS},
+            "overall_score": result["overall_score"]
+        },
+        {"stage": "analyzed", "analysis": result["analysis"], "overall_score": result["overall_score"]},
+        {"stage": "mockup", "mockup_id": result["mockup_id"], "mockup_url": result["mockup_url"]}
+    ]
+
+@app.post("/api/analyze/stream")
+async def analyze_website_stream(request: AnalyzeRequest):
+    """Complete website analysis, streamed as one SSE event per pipeline stage"""
+    url, cache_key = site_url(request.url)
+    cached = None if request.force_refresh else analysis_cache.get(cache_key)
+    
+    async def events():
+        if cached is not None:
+            for stage in result_stages(cached):
+                if stage["stage"] == "mockup" and request.include_image_data:
+                    stage = await with_inline_image(stage)
+                yield format_sse(stage)
+            yield format_sse({"stage": "complete", "done": True, "cached": True, "analyzed_at": cached["analyzed_at"]})
+            return
         
-        result = {
-            "url": url,
-            "scraped_data": scraped_data,
-            "analysis": analysis,
-            "overall_score": round(overall_score, 1),
-            "mockup_image": mockup_image,
-            "analyzed_at": datetime.utcnow().isoformat()
-        }
+        queue: asyncio.Queue = asyncio.Queue()
         
-        return result
+        async def progress(stage: str, payload: Dict):
+            if stage == "mockup" and request.include_image_data:
+                payload = await with_inline_image(payload)
+            await queue.put({"stage": stage, **payload})
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        async def run():
+            try:
+                result = await run_analysis_shared(url, progress)
+                await queue.put({"stage": "complete", "done": True, "cached": False, "analyzed_at": result["analyzed_at"]})
+            except Exception as e:
+                await queue.put({"stage": "error", "done": True, "detail": str(e)})
+        
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await queue.get()
+                yield format_sse(event)
+                if event.get("done"):
+                    break
+        finally:
+            # Client went away: stop paying for stages nobody will see
+            task.cancel()
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/analyze/jobs", status_code=202)
+async def create_analysis_job(request: AnalyzeRequest):
+    """Start a background analysis and return its job ID immediately"""
+    url, cache_key = site_url(request.url)
+    payload = {"url": url}
+    
+    if not request.force_refresh:
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return analysis_jobs.add_finished(payload, {**cached, "cached": True}).to_dict()
+    
+    try:
+        job = analysis_jobs.submit(payload)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many analyses in progress, please retry shortly")
+    
+    return job.to_dict()
+
+@app.get("/api/analyze/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Poll a background analysis; `result` fills in stage by stage"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_PER_DOMAIN = int(os.getenv("BATCH_PER_DOMAIN", "2"))
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """Analyze a list of sites, streaming one NDJSON line per URL as each finishes
+
+    Requests can lower, but not raise, the BATCH_CONCURRENCY and BATCH_PER_DOMAIN
+    limits. Mockups are skipped unless `include_mockups` is set.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    per_domain = max(1, min(request.per_domain or BATCH_PER_DOMAIN, BATCH_PER_DOMAIN))
+    global_slots = asyncio.Semaphore(concurrency)
+    domain_slots = KeyedSlots(per_domain)
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def analyze_one(index: int, raw_url: str):
+        line = {"index": index, "url": raw_url}
+        try:
+            url = ensure_scheme(raw_url)
+            cache_key = canonicalize_url(url)
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                line.update(status="complete", result={**cached, "cached": True})
+            else:
+                domain = urlsplit(cache_key).hostname or ""
+                async with domain_slots.slot(domain, global_slots):
+                    if request.include_mockups:
+                        result = await run_analysis_shared(url)
+                    else:
+                        result = await run_analysis(url, include_mockup=False)
+                line.update(status="complete", result={**result, "cached": False})
+        except Exception as e:
+            line.update(status="failed", error=str(e))
+        await queue.put(line)
+    
+    async def lines():
+        tasks = [asyncio.create_task(analyze_one(i, url)) for i, url in enumerate(request.urls)]
+        succeeded = 0
+        try:
+            for _ in tasks:
+                line = await queue.get()
+                succeeded += line["status"] == "complete"
+                yield json.dumps(line) + "\n"
+            yield json.dumps({
+                "done": True,
+                "total": len(tasks),
+                "succeeded": succeeded,
+                "failed": len(tasks) - succeeded
+            }) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/mockups/{mockup_id}.png")
+async def get_mockup(mockup_id: str, request: Request):
+    """Serve a generated mockup; IDs address the image prompt, so a URL always shows the same design"""
+    stored = await mockup_store.open(mockup_id) if DiskStore.is_key(mockup_id) else None
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Mockup not found")
+    
+    path, size, etag = stored
+    return serve_file(
+        request, path, size, etag,
+        media_type="image/png",
+        cache_control="public, max-age=31536000, immutable"
+    )
+
+@app.get("/api/metrics")
+async def metrics():
+    """In-process cache and pipeline counters"""
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "mockup_store": mockup_store.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "analysis_coalescing": analysis_flights.stats(),
+        "llm_pool": llm_pool.stats(),
+        "reply_cache": reply_cache.stats(),
+        "sanity_cache": sanity_cache.stats(),
+        "image_proxy": image_proxy.stats(),
+        "llm_latency": llm_latency.snapshot(),
+        "llm_tokens": llm_tokens.snapshot()
+    }
 
 @app.post("/api/consultation")
 async def request_consultation(request: ConsultationRequest):
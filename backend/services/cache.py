@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire a fixed time after being set"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+class _SWREntry:
+    __slots__ = ("fetched_at", "value", "tags", "fetch")
+
+    def __init__(self, value: Any, tags: FrozenSet[str], fetch: Callable[[], Awaitable[Any]]):
+        self.fetched_at = time.monotonic()
+        self.value = value
+        self.tags = tags
+        self.fetch = fetch
+
+
+class _SWRFetch:
+    """An in-flight fetch; `discard` is set when its key is invalidated or
+    re-fetched before it finishes, so its result is not stored"""
+    __slots__ = ("future", "tags", "discard")
+
+    def __init__(self, tags: FrozenSet[str]):
+        self.future: Optional[asyncio.Future] = None
+        self.tags = tags
+        self.discard = False
+
+
+class SWRCache:
+    """Async stale-while-revalidate cache.
+
+    Entries younger than `ttl` are served as they are. Entries up to `stale_ttl`
+    past that are still served immediately while one background refresh per
+    key replaces them. Older entries, or misses, wait for the fetch; concurrent
+    misses for one key share it. When a fetch fails, the last good value is
+    served, however old, if there is one. At most `maxsize` keys are kept (LRU).
+
+    Entries can carry tags so that everything derived from one kind of source
+    document can be dropped (`invalidate`) or re-fetched in place (`revalidate`)
+    when that source changes. A fetch that was already running when its key was
+    invalidated does not store its result. Background refreshes (stale hits and
+    `revalidate`) run at most `max_refreshes` at a time, so revalidating a tag
+    on many keys does not send every upstream request at once.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float, max_refreshes: int = 4):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_refreshes = max_refreshes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, _SWREntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, _SWRFetch] = {}
+        self._refresh_slots = asyncio.Semaphore(max_refreshes)
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+    ) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._refresh(key, fetch, frozenset(tags))
+                return entry.value
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        future = inflight.future if inflight else self._start_fetch(key, fetch, frozenset(tags))
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            entry = self._data.get(key)
+            if entry is None:
+                raise
+            self.fallbacks += 1
+            logger.warning(f"Serving last good value for {key!r} after a failed refresh")
+            return entry.value
+
+    def _start_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        tags: FrozenSet[str],
+        background: bool = False,
+    ) -> asyncio.Future:
+        previous = self._inflight.get(key)
+        if previous is not None:
+            previous.discard = True
+        state = self._inflight[key] = _SWRFetch(tags)
+
+        async def run():
+            try:
+                if background:
+                    async with self._refresh_slots:
+                        value = await fetch()
+                else:
+                    value = await fetch()
+                if not state.discard:
+                    self._store(key, _SWREntry(value, tags, fetch))
+                return value
+            finally:
+                if self._inflight.get(key) is state:
+                    del self._inflight[key]
+
+        state.future = asyncio.ensure_future(run())
+        return state.future
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], tags: FrozenSet[str]):
+        self._start_fetch(key, fetch, tags, background=True).add_done_callback(lambda f: self._refresh_done(key, f))
+
+    def _refresh_done(self, key: Hashable, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh of {key!r} failed: {future.exception()}")
+
+    def _store(self, key: Hashable, entry: _SWREntry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _tagged(self, tag: str) -> List[Hashable]:
+        return [key for key, entry in self._data.items() if tag in entry.tags]
+
+    def _discard_inflight(self, tag: str, keys: List[Hashable]):
+        keys = set(keys)
+        for key, inflight in self._inflight.items():
+            if key in keys or tag in inflight.tags:
+                inflight.discard = True
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying `tag`; returns how many were dropped"""
+        keys = self._tagged(tag)
+        for key in keys:
+            del self._data[key]
+        self._discard_inflight(tag, keys)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def revalidate(self, tag: str) -> int:
+        """Re-fetch every entry carrying `tag` in the background, serving the
+        current values until the new ones arrive; returns how many were started
+        """
+        keys = self._tagged(tag)
+        self._discard_inflight(tag, keys)
+        for key in keys:
+            entry = self._data[key]
+            self._refresh(key, entry.fetch, entry.tags)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        for inflight in self._inflight.values():
+            inflight.discard = True
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "max_refreshes": self.max_refreshes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "refresh_errors": self.refresh_errors,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _etag(data: bytes) -> str:
+    # Keys address what a file was made from (a prompt, an asset variant), not its
+    # bytes, so the ETag hashes the file itself
+    return '"' + hashlib.sha256(data).hexdigest() + '"'
+
+
+class DiskStore:
+    """Content-addressed on-disk LRU store of binary files (mockup PNGs, image variants).
+
+    Files are named `<key><extension>` (`.png` by default). The index (key -> size,
+    in LRU order) is rebuilt from the directory at startup using file mtimes, which
+    are bumped on every hit, and the least recently used files are deleted once
+    `max_bytes` is exceeded.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, extension: str = '.png'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._etags: Dict[str, str] = {}
+
+    def load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            path = os.path.join(self.directory, name)
+            if ext != self.extension or not _KEY_RE.match(key):
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        self._index.clear()
+        self.total_bytes = 0
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.total_bytes += size
+        self._evict()
+        logger.info(f"Disk store {self.directory} loaded {len(self._index)} files ({self.total_bytes} bytes)")
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.extension}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @staticmethod
+    def is_key(value: str) -> bool:
+        return bool(_KEY_RE.match(value))
+
+    async def open(self, key: str) -> Optional[Tuple[str, int, str]]:
+        """Path, size and strong ETag of a stored file, marking it recently used"""
+        if key not in self._index:
+            return None
+        try:
+            etag = self._etags.get(key)
+            if etag is None:
+                etag = self._etags[key] = _etag(await asyncio.to_thread(self._read, key))
+            else:
+                await asyncio.to_thread(os.utime, self.path_for(key))
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        self._index.move_to_end(key)
+        return self.path_for(key), self._index[key], etag
+
+    async def lookup(self, key: str) -> bool:
+        """Whether a file exists for `key`, counted as a cache hit or miss and
+        marked recently used"""
+        if key in self._index:
+            try:
+                await asyncio.to_thread(os.utime, self.path_for(key))
+            except FileNotFoundError:
+                self._forget(key)
+            else:
+                self._index.move_to_end(key)
+                self.hits += 1
+                return True
+        self.misses += 1
+        return False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key not in self._index:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read, key)
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        self._index.move_to_end(key)
+        return data
+
+    async def put(self, key: str, data: bytes):
+        await asyncio.to_thread(self._write, key, data)
+        self._forget(key)
+        self._index[key] = len(data)
+        self._etags[key] = _etag(data)
+        self.total_bytes += len(data)
+        self._evict()
+
+    def _read(self, key: str) -> bytes:
+        path = self.path_for(key)
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)
+        return data
+
+    def _write(self, key: str, data: bytes):
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _forget(self, key: str):
+        self.total_bytes -= self._index.pop(key, 0)
+        self._etags.pop(key, None)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._forget(key)
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "files": len(self._index),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
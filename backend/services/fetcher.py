@@ -0,0 +1,229 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from services.slots import KeyedSlots
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that caches DNS lookups for a fixed TTL.
+
+    Every address a host resolves to is kept and tried in resolver order, so an
+    unreachable first address (often IPv6) falls back to the next one, as it
+    would if httpcore resolved the name itself. Expired entries are dropped
+    whenever a lookup misses.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, ttl: float):
+        self._backend = backend
+        self._ttl = ttl
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        entry = self._cache.get((host, port))
+        if entry and entry[0] > now:
+            return entry[1]
+
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            # Raised as httpcore's error so callers see httpx.ConnectError, as without the cache
+            raise httpcore.ConnectError(str(e)) from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise httpcore.ConnectError(f"No addresses found for {host}")
+        self._cache[(host, port)] = (now + self._ttl, addresses)
+        return addresses
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        error: Optional[Exception] = None
+        for address in await self._resolve(host, port):
+            try:
+                # TLS still uses the original hostname for SNI, httpcore passes it to start_tls()
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        self._cache.pop((host, port), None)
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors as the httpx errors callers catch, most specific first
+_HTTPCORE_ERRORS = [
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+]
+
+
+@contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as e:
+        for core_error, httpx_error in _HTTPCORE_ERRORS:
+            if isinstance(e, core_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _httpx_errors():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _DnsCachingTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore pool that resolves hosts through the DNS cache"""
+
+    def __init__(self, dns_ttl: float, http2: bool, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=_CachingNetworkBackend(httpcore.AnyIOBackend(), dns_ttl),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+class FetchEngine:
+    """Shared async HTTP client for fetching third-party pages.
+
+    One connection pool is opened at startup and reused by every scrape. HTTP/2 is
+    negotiated when `h2` is installed, gzip/brotli bodies are decoded by httpx, DNS
+    answers are cached and each host gets a bounded number of concurrent requests.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_per_host: Optional[int] = None,
+        timeout: Optional[float] = None,
+        dns_ttl: Optional[float] = None,
+    ):
+        self.max_connections = max_connections or int(os.getenv("FETCH_MAX_CONNECTIONS", "100"))
+        self.max_per_host = max_per_host or int(os.getenv("FETCH_MAX_PER_HOST", "6"))
+        self.timeout = timeout or float(os.getenv("FETCH_TIMEOUT", "15"))
+        self.dns_ttl = dns_ttl or float(os.getenv("FETCH_DNS_TTL", "300"))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots = KeyedSlots(self.max_per_host)
+
+    async def start(self):
+        if self._client is not None:
+            return
+        transport = _DnsCachingTransport(
+            dns_ttl=self.dns_ttl,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections // 2,
+                keepalive_expiry=30.0,
+            ),
+        )
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(self.timeout),
+            follow_redirects=True,
+        )
+        logger.info(f"Fetch engine started (http2={HTTP2_AVAILABLE}, per_host={self.max_per_host})")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str):
+        async with self._host_slots.slot((urlsplit(url).hostname or "").lower()):
+            yield
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """GET a URL and yield the response before its body is read.
+
+        Leaving the block early closes the connection, so callers can stop reading
+        a body part-way through.
+        """
+        if self._client is None:
+            raise RuntimeError("Fetch engine is not started")
+        async with self._host_slot(url):
+            async with self._client.stream("GET", url, headers=headers) as response:
+                yield response
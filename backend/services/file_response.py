@@ -0,0 +1,102 @@
+import asyncio
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for GET)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Resolve a single `bytes=` range to inclusive offsets.
+
+    Returns None when the header is absent, malformed or asks for several ranges
+    (the whole body is served instead) and raises ValueError when unsatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError("range not satisfiable")
+    return first, min(last, size - 1)
+
+
+async def _read_file(path: str, start: int, length: int):
+    with open(path, 'rb') as f:
+        await asyncio.to_thread(f.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(
+    request: Request,
+    path: str,
+    size: int,
+    etag: str,
+    media_type: str,
+    cache_control: str,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Stream a file from disk with ETag, conditional GET and Range support"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        **(extra_headers or {})
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_read_file(path, 0, size), media_type=media_type, headers=headers)
+
+    first, last = byte_range
+    length = last - first + 1
+    headers["Content-Length"] = str(length)
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return StreamingResponse(_read_file(path, first, length), status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,256 @@
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+
+# Tree-building rules of BeautifulSoup's html.parser builder. The extractor
+# mirrors them so its output matches the soup-based scraper it replaced.
+VOID_TAGS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+    'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid',
+    'param', 'source', 'spacer', 'track', 'wbr'
+])
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+ASCII_SPACES = ' \n\t\x0c\r'
+
+H1_LIMIT = 3
+H2_LIMIT = 5
+
+# Kinds of string a flushed data segment can become
+_TEXT, _CDATA, _OTHER = 0, 1, 2
+
+
+class _Open:
+    """An element on the open-element stack"""
+    __slots__ = ('name', 'heading', 'node')
+
+    def __init__(self, name: str, heading: Optional[List[str]], node: Optional[list]):
+        self.name = name
+        self.heading = heading
+        self.node = node
+
+
+def _node_string(node: list) -> Optional[str]:
+    # Same rule as Tag.string: a single child string, or the string of a single child tag
+    if len(node) != 1:
+        return None
+    child = node[0]
+    return child if isinstance(child, str) else _node_string(child)
+
+
+class SignalExtractor(HTMLParser):
+    """Single-pass extractor for the signals used by the analyzer.
+
+    Feed it markup with `feed()` (all at once or in chunks) and call `close()`,
+    then read `data`. No document tree is built: only the open-element stack,
+    the first <title> subtree and the text of the collected headings are kept.
+    """
+
+    def __init__(self, url: str):
+        super().__init__(convert_charrefs=False)
+        self.url = url
+        self.title_found = False
+        self.meta_description: Optional[str] = None
+        self.has_viewport = False
+        self.has_canonical = False
+        self.og_image: Optional[str] = None
+        self.link_count = 0
+        self.image_count = 0
+        self.has_nav = False
+        self.has_footer = False
+        self.has_form = False
+
+        self._stack: List[_Open] = []
+        self._open_counts: Dict[str, int] = {}
+        self._already_closed: List[str] = []
+        self._pending: List[str] = []
+        self._containers = 0
+        self._preserve = 0
+        self._title_node: Optional[list] = None
+        self._h1: List[List[str]] = []
+        self._h2: List[List[str]] = []
+        self._active_headings: List[List[str]] = []
+
+    @property
+    def data(self) -> Dict:
+        title = 'No title'
+        if self._title_node is not None:
+            title = _node_string(self._title_node)
+        return {
+            'url': self.url,
+            'title': title,
+            'meta_description': self.meta_description or '',
+            'h1_tags': [''.join(parts) for parts in self._h1],
+            'h2_tags': [''.join(parts) for parts in self._h2],
+            'has_viewport': self.has_viewport,
+            'has_canonical': self.has_canonical,
+            'og_image': self.og_image or '',
+            'link_count': self.link_count,
+            'image_count': self.image_count,
+            'has_nav': self.has_nav,
+            'has_footer': self.has_footer,
+            'has_form': self.has_form
+        }
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self, kind: int = _TEXT):
+        if not self._pending:
+            return
+        data = ''.join(self._pending)
+        self._pending = []
+        if not self._preserve and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+
+        top = self._stack[-1] if self._stack else None
+        if top is not None and top.node is not None:
+            top.node.append(data)
+
+        if self._active_headings and (kind == _CDATA or (kind == _TEXT and not self._containers)):
+            stripped = data.strip()
+            if stripped:
+                for heading in self._active_headings:
+                    heading.append(stripped)
+
+    def _start(self, tag: str, attrs, handle_void: bool):
+        self._flush()
+
+        heading = None
+        if tag == 'a':
+            self.link_count += 1
+        elif tag == 'img':
+            self.image_count += 1
+        elif tag == 'meta':
+            values = self._attr_dict(attrs)
+            name = values.get('name')
+            if name == 'description':
+                if self.meta_description is None:
+                    self.meta_description = values.get('content', '')
+            elif name == 'viewport':
+                self.has_viewport = True
+            if values.get('property') == 'og:image' and self.og_image is None:
+                self.og_image = values.get('content', '')
+        elif tag == 'link':
+            rel = self._attr_dict(attrs).get('rel')
+            if rel is not None and 'canonical' in rel.split():
+                self.has_canonical = True
+        elif tag == 'h1':
+            if len(self._h1) < H1_LIMIT:
+                heading = []
+                self._h1.append(heading)
+        elif tag == 'h2':
+            if len(self._h2) < H2_LIMIT:
+                heading = []
+                self._h2.append(heading)
+        elif tag == 'nav':
+            self.has_nav = True
+        elif tag == 'footer':
+            self.has_footer = True
+        elif tag == 'form':
+            self.has_form = True
+
+        node = None
+        top = self._stack[-1] if self._stack else None
+        if top is not None and top.node is not None:
+            node = []
+            top.node.append(node)
+        elif tag == 'title' and not self.title_found:
+            self.title_found = True
+            node = self._title_node = []
+
+        self._stack.append(_Open(tag, heading, node))
+        self._open_counts[tag] = self._open_counts.get(tag, 0) + 1
+        if heading is not None:
+            self._active_headings.append(heading)
+        if tag in STRING_CONTAINER_TAGS:
+            self._containers += 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve += 1
+
+        if handle_void and tag in VOID_TAGS:
+            self._end(tag)
+            self._already_closed.append(tag)
+
+    def _end(self, tag: str):
+        self._flush()
+        if not self._open_counts.get(tag):
+            return
+        while self._stack:
+            element = self._stack.pop()
+            self._open_counts[element.name] -= 1
+            if element.heading is not None:
+                self._active_headings.pop()
+            if element.name in STRING_CONTAINER_TAGS:
+                self._containers -= 1
+            if element.name in PRESERVE_WHITESPACE_TAGS:
+                self._preserve -= 1
+            if element.name == tag:
+                break
+
+    @staticmethod
+    def _attr_dict(attrs) -> Dict[str, str]:
+        return {key: '' if value is None else value for key, value in attrs}
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, handle_void=True)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, handle_void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._already_closed:
+            self._already_closed.remove(tag)
+        else:
+            self._end(tag)
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            codepoint = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            codepoint = int(name.lstrip('X'), 16)
+        else:
+            codepoint = int(name)
+        self._pending.append(UnicodeDammit.numeric_character_reference(codepoint)[0])
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self._pending.append(character if character is not None else '&' + name)
+
+    def handle_comment(self, data):
+        self._flush()
+        self._pending.append(data)
+        self._flush(_OTHER)
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._pending.append(decl[len('DOCTYPE '):])
+        self._flush(_OTHER)
+
+    def unknown_decl(self, data):
+        kind = _OTHER
+        if data.upper().startswith('CDATA['):
+            kind = _CDATA
+            data = data[len('CDATA['):]
+        self._flush()
+        self._pending.append(data)
+        self._flush(kind)
+
+    def handle_pi(self, data):
+        self._flush()
+        self._pending.append(data)
+        self._flush(_OTHER)
+
+
+def extract_signals(html: str, url: str) -> Dict:
+    """Extract analyzer signals from an HTML document in one pass"""
+    extractor = SignalExtractor(url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.data
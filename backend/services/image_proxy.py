@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import io
+import logging
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from services.disk_store import DiskStore
+from services.sanity import sanity_client
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# `<asset hash>-<width>x<height>.<ext>`, the file name of a Sanity image asset. SVGs and
+# GIFs are left alone: variants are single-frame, so a GIF would lose its animation
+ASSET_FILENAME_RE = re.compile(r'^[0-9a-f]+-(\d+)x(\d+)\.(jpg|jpeg|png|webp|tif|tiff|avif)$')
+_ASSET_URL_RE = re.compile(r'^https://cdn\.sanity\.io/images/([^/]+)/([^/]+)/([^/?#]+)$')
+
+IMAGE_ROUTE = "/api/sanity/images"
+
+AVIF_AVAILABLE = features.check("avif")
+WEBP_AVAILABLE = features.check("webp")
+
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Output format for an `Accept` header: avif, then webp, else "legacy"
+    (JPEG, or PNG for images with transparency)"""
+    accept = (accept or "").lower()
+    if AVIF_AVAILABLE and "image/avif" in accept:
+        return "avif"
+    if WEBP_AVAILABLE and "image/webp" in accept:
+        return "webp"
+    return "legacy"
+
+
+def media_type_of(head: bytes) -> str:
+    """Media type of an encoded variant, from its first bytes"""
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return "image/jpeg"
+
+
+def render_variant(data: bytes, width: int, fmt: str, quality: Dict[str, int]) -> bytes:
+    """Decode an image, scale it down to `width` (never up) and encode it as `fmt`.
+
+    JPEG sources are decoded at a reduced scale when possible, EXIF orientation
+    is applied and metadata other than the ICC profile is dropped.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        if source.format == "JPEG" and source.width > width:
+            # Orientations 5-8 swap the axes, so the displayed width is the stored height
+            if source.getexif().get(0x0112) in (5, 6, 7, 8):
+                source.draft("RGB", (width * source.width // source.height, width))
+            else:
+                source.draft("RGB", (width, width * source.height // source.width))
+        image = ImageOps.exif_transpose(source)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        if fmt == "legacy":
+            fmt = "png" if has_alpha else "jpeg"
+        icc_profile = source.info.get("icc_profile")
+        image = image.convert("RGBA" if has_alpha and fmt != "jpeg" else "RGB")
+
+    options: Dict[str, Any] = {"icc_profile": icc_profile} if icc_profile else {}
+    if fmt == "jpeg":
+        options.update(quality=quality["jpeg"], optimize=True, progressive=True)
+    elif fmt == "webp":
+        options.update(quality=quality["webp"], method=4)
+    elif fmt == "avif":
+        options.update(quality=quality["avif"])
+    else:
+        options.update(optimize=True)
+    out = io.BytesIO()
+    image.save(out, format=fmt.upper(), **options)
+    return out.getvalue()
+
+
+class ImageProxy:
+    """Resized and transcoded variants of Sanity image assets, cached on disk.
+
+    Variants are keyed by asset file, width and output format, and widths are
+    snapped to a fixed list so the cache stays bounded. Concurrent requests for
+    one variant share a single download and encode, and at most `concurrency`
+    encodes run at once (AVIF in particular is CPU heavy).
+    """
+
+    def __init__(
+        self,
+        store: DiskStore,
+        widths: Iterable[int],
+        max_source_bytes: int,
+        concurrency: int,
+        quality: Dict[str, int],
+        base_url: str = ""
+    ):
+        self.store = store
+        # Public origin of this backend; the frontend is served from another one
+        self.base_url = base_url.rstrip("/")
+        self.widths = tuple(sorted(set(widths)))
+        self.max_source_bytes = max_source_bytes
+        self.quality = quality
+        self._encodes = asyncio.Semaphore(concurrency)
+        self._flights = SingleFlight()
+
+    def snap_width(self, width: Optional[int]) -> int:
+        """Smallest configured width that is at least `width` (the largest by default)"""
+        if width is None:
+            return self.widths[-1]
+        return next((w for w in self.widths if w >= width), self.widths[-1])
+
+    def _key(self, filename: str, width: int, fmt: str) -> str:
+        quality = ",".join(f"{name}={value}" for name, value in sorted(self.quality.items()))
+        return hashlib.sha256(f"{filename}\n{width}\n{fmt}\n{quality}".encode("utf-8")).hexdigest()
+
+    async def variant(self, filename: str, width: int, fmt: str) -> Tuple[str, int, str, str]:
+        """Path, size, ETag and media type of a variant, rendering it on a cache miss"""
+        key = self._key(filename, width, fmt)
+        stored = await self.store.open(key) if await self.store.lookup(key) else None
+        if stored is None:
+            await self._flights.run(key, lambda progress: self._render(key, filename, width, fmt))
+            stored = await self.store.open(key)
+            if stored is None:
+                raise HTTPException(status_code=500, detail="Image variant was evicted before it could be served")
+
+        path, size, etag = stored
+        if fmt in MEDIA_TYPES:
+            return path, size, etag, MEDIA_TYPES[fmt]
+        with open(path, "rb") as f:
+            head = await asyncio.to_thread(f.read, 16)
+        return path, size, etag, media_type_of(head)
+
+    async def _render(self, key: str, filename: str, width: int, fmt: str):
+        source = await sanity_client.fetch_asset(filename, self.max_source_bytes)
+        async with self._encodes:
+            try:
+                data = await asyncio.to_thread(render_variant, source, width, fmt, self.quality)
+            except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+                logger.warning(f"Cannot render {filename} at {width}px as {fmt}: {str(e)}")
+                raise HTTPException(status_code=415, detail="Unsupported image")
+        await self.store.put(key, data)
+        logger.info(f"Rendered {filename} at {width}px as {fmt}: {len(source)} -> {len(data)} bytes")
+
+    def sources(self, url: str, base_url: str) -> Optional[Dict[str, str]]:
+        """Absolute `src` and `srcset` proxy URLs under `base_url` for a Sanity asset
+        URL of this dataset, or None"""
+        match = _ASSET_URL_RE.match(url)
+        if not match or (match.group(1), match.group(2)) != (sanity_client.project_id, sanity_client.dataset):
+            return None
+        filename = match.group(3)
+        size = ASSET_FILENAME_RE.match(filename)
+        if not size:
+            return None
+
+        source_width = int(size.group(1))
+        candidates = []
+        for width in self.widths:
+            candidates.append((f"{base_url}{IMAGE_ROUTE}/{filename}?w={width}", min(width, source_width)))
+            if width >= source_width:
+                break
+        return {
+            "src": candidates[-1][0],
+            "srcset": ", ".join(f"{src} {width}w" for src, width in candidates)
+        }
+
+    def add_sources(self, value: Any, base_url: str):
+        """Add `src`/`srcset` next to every dereferenced image `asset` in Sanity results, in place"""
+        if isinstance(value, list):
+            for item in value:
+                self.add_sources(item, base_url)
+        elif isinstance(value, dict):
+            asset = value.get("asset")
+            if isinstance(asset, dict) and isinstance(asset.get("url"), str):
+                value.update(self.sources(asset["url"], base_url) or {})
+            for item in value.values():
+                self.add_sources(item, base_url)
+
+    def stats(self) -> Dict:
+        return {**self.store.stats(), **self._flights.stats()}
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A unit of background work whose partial result can be polled"""
+
+    def __init__(self, payload: Dict):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.updated_at = self.created_at
+
+    def update(self, status: Optional[str] = None, **result):
+        if status:
+            self.status = status
+        self.result.update(result)
+        self.updated_at = datetime.utcnow().isoformat()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("complete", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class JobQueue:
+    """Bounded queue of jobs drained by a fixed pool of worker tasks.
+
+    `handler` receives each job and reports progress through `job.update()`.
+    Queued and running jobs are always readable; finished ones stay readable for
+    `ttl` seconds, and only the most recent `max_jobs` of them are kept.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[None]],
+        workers: int,
+        max_queued: int,
+        ttl: float,
+        max_jobs: int = 1000,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._active: Dict[str, Job] = {}
+        self._finished = TTLCache(maxsize=max_jobs, ttl=ttl)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Dict) -> Job:
+        """Queue a job, raising asyncio.QueueFull when the backlog is at capacity"""
+        job = Job(payload)
+        self._queue.put_nowait(job)
+        self._active[job.id] = job
+        return job
+
+    def add_finished(self, payload: Dict, result: Dict) -> Job:
+        """Record a job whose result is already known, e.g. from a cache"""
+        job = Job(payload)
+        job.update("complete", **result)
+        self._finished.set(job.id, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.handler(job)
+                if not job.done:
+                    job.update("complete")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                job.error = str(e)
+                job.update("failed")
+            finally:
+                self._active.pop(job.id, None)
+                self._finished.set(job.id, job)
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "tracked": len(self._active) + len(self._finished)
+        }
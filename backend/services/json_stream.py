@@ -0,0 +1,69 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+FieldCallback = Callable[[str, Any], Awaitable[None]]
+
+
+class JSONObjectStream:
+    """Parses a JSON object from streamed text, one top-level member at a time.
+
+    Anything before the first `{` (a ```json fence, a stray sentence) and after
+    the matching `}` is ignored, so fenced and bare replies both work. `feed`
+    returns the (key, value) pairs completed by that chunk; a member is complete
+    once the `,` or `}` that ends it has arrived.
+    """
+
+    def __init__(self):
+        self.result: Dict[str, Any] = {}
+        self.done = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._finish_member())
+                    self.done = True
+                    continue
+            elif char == ',' and self._depth == 1:
+                completed.extend(self._finish_member())
+                continue
+            self._member.append(char)
+        return completed
+
+    def _finish_member(self) -> List[Tuple[str, Any]]:
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        member = json.loads('{' + text + '}')
+        self.result.update(member)
+        return list(member.items())
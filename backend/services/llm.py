@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+from emergentintegrations.llm.chat import UserMessage
+
+from services.llm_pool import LLMClientPool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import litellm
+except ImportError:
+    litellm = None
+
+# Provider clients shared by every LLM call; started and closed by the app lifespan
+llm_pool = LLMClientPool()
+
+# Model aliases used by the chat endpoints: alias -> (provider, model)
+CHAT_MODELS = {
+    "claude": ("anthropic", "claude-4-sonnet-20250514"),
+    "gpt": ("openai", "gpt-5.1"),
+    "gemini": ("gemini", "gemini-2.5-pro")
+}
+
+# Direct provider keys enable true token streaming through litellm
+PROVIDER_KEY_ENV = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "gemini": "GEMINI_API_KEY"
+}
+
+
+def provider_key(provider: str) -> Optional[str]:
+    value = os.getenv(PROVIDER_KEY_ENV.get(provider, ""), "")
+    if not value or value.startswith("your_"):
+        return None
+    return value
+
+
+def transcript(messages: List[Dict[str, str]]) -> str:
+    """Fold a chat history into one prompt for single-message APIs"""
+    if len(messages) == 1:
+        return messages[0]["content"]
+    lines = [f"{message['role'].capitalize()}: {message['content']}" for message in messages]
+    return "Conversation so far:\n\n" + "\n\n".join(lines) + "\n\nReply to the last user message."
+
+
+def reply_key(alias: str, system_message: str, messages: List[Dict[str, str]]) -> str:
+    """Cache key for a model's reply to a conversation.
+
+    Case and runs of whitespace are folded so retyped demo prompts share an entry.
+    """
+    normalized = "\n".join(
+        f"{message['role']}:{' '.join(message['content'].lower().split())}" for message in messages
+    )
+    return hashlib.sha256(f"{alias}\n{system_message}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+async def stream_chat(
+    provider: str,
+    model: str,
+    system_message: str,
+    messages: List[Dict[str, str]],
+) -> AsyncIterator[str]:
+    """Yield reply text as the provider produces it.
+
+    With a direct provider key configured the completion is streamed token by
+    token through litellm, the library LlmChat itself wraps. LlmChat has no
+    streaming call, so with only EMERGENT_LLM_KEY the reply arrives as one chunk.
+    Closing the generator aborts the upstream request.
+    """
+    key = provider_key(provider)
+    if key and litellm is not None:
+        response = await litellm.acompletion(
+            model=f"{provider}/{model}",
+            messages=[{"role": "system", "content": system_message}, *messages],
+            api_key=key,
+            stream=True
+        )
+        try:
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            # litellm's wrapper has no close(); closing its inner stream drops the HTTP connection
+            close = getattr(getattr(response, "completion_stream", None), "aclose", None)
+            if close is not None:
+                await close()
+        return
+
+    async with llm_pool.chat(provider, model, system_message) as chat:
+        reply = await chat.send_message(UserMessage(text=transcript(messages)))
+    yield reply
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from emergentintegrations.llm.chat import LlmChat
+from emergentintegrations.llm.openai.image_generation import OpenAIImageGeneration
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str]
+
+
+class _Session:
+    def __init__(self, chat: LlmChat):
+        self.chat = chat
+        self.idle_since = time.monotonic()
+        # LlmChat keeps the conversation in its (undocumented) `messages` list;
+        # remember where the system prompt ends so a pooled session can be
+        # trimmed back to it. Without that list sessions are never reused.
+        messages = getattr(chat, "messages", None)
+        self.baseline = len(messages) if isinstance(messages, list) else None
+
+    def reset(self) -> bool:
+        """Drop the previous caller's turns; False if that isn't possible"""
+        if self.baseline is None:
+            return False
+        messages = getattr(self.chat, "messages", None)
+        if not isinstance(messages, list) or len(messages) < self.baseline:
+            return False
+        del messages[self.baseline:]
+        return True
+
+
+class LLMClientPool:
+    """Lifespan-managed LlmChat sessions and image client shared by the analyze,
+    chat and battle paths.
+
+    LlmChat sessions are pooled per (provider, model, system message) and lent to
+    one caller at a time, at most `max_idle` kept per key. The image client is
+    stateless and shared. A periodic health check drops sessions idle for longer
+    than `idle_ttl`. Direct litellm streaming calls are not pooled here.
+    """
+
+    def __init__(
+        self,
+        max_idle: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        health_interval: Optional[float] = None,
+    ):
+        self.max_idle = max_idle or int(os.getenv("LLM_POOL_SIZE", "8"))
+        self.idle_ttl = idle_ttl or float(os.getenv("LLM_POOL_IDLE_TTL", "300"))
+        self.health_interval = health_interval or float(os.getenv("LLM_POOL_HEALTH_INTERVAL", "60"))
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.in_use = 0
+        self._idle: Dict[SessionKey, Deque[_Session]] = {}
+        self._image_client: Optional[OpenAIImageGeneration] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _api_key(self) -> str:
+        api_key = os.getenv("EMERGENT_LLM_KEY")
+        if not api_key:
+            raise ValueError("EMERGENT_LLM_KEY not found")
+        return api_key
+
+    async def start(self):
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        self._idle.clear()
+        self._image_client = None
+
+    @asynccontextmanager
+    async def chat(self, provider: str, model: str, system_message: str):
+        """Borrow an LlmChat session, returned to the pool if the call succeeds"""
+        key = (provider, model, system_message)
+        session = self._checkout(key)
+        self.in_use += 1
+        try:
+            yield session.chat
+        except BaseException:
+            self.discarded += 1
+            raise
+        else:
+            self._checkin(key, session)
+        finally:
+            self.in_use -= 1
+
+    def _checkout(self, key: SessionKey) -> _Session:
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            session = idle.pop()
+            if now - session.idle_since <= self.idle_ttl:
+                self.reused += 1
+                return session
+            self.discarded += 1
+
+        provider, model, system_message = key
+        chat = LlmChat(
+            api_key=self._api_key(),
+            session_id=f"pool-{provider}-{uuid.uuid4().hex}",
+            system_message=system_message
+        ).with_model(provider, model)
+        self.created += 1
+        return _Session(chat)
+
+    def _checkin(self, key: SessionKey, session: _Session):
+        idle = self._idle.setdefault(key, deque())
+        if not session.reset() or len(idle) >= self.max_idle:
+            self.discarded += 1
+            return
+        session.idle_since = time.monotonic()
+        idle.append(session)
+
+    def image_client(self) -> OpenAIImageGeneration:
+        if self._image_client is None:
+            self._image_client = OpenAIImageGeneration(api_key=self._api_key())
+        return self._image_client
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"LLM pool health check failed: {str(e)}")
+
+    def check_health(self):
+        now = time.monotonic()
+        for key, idle in list(self._idle.items()):
+            fresh = deque(session for session in idle if now - session.idle_since <= self.idle_ttl)
+            self.discarded += len(idle) - len(fresh)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+    def stats(self) -> Dict:
+        return {
+            "idle": sum(len(idle) for idle in self._idle.values()),
+            "in_use": self.in_use,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded
+        }
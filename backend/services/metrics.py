@@ -0,0 +1,64 @@
+from collections import deque
+from typing import Deque, Dict
+
+
+class SampleStats:
+    """Rolling samples summarized as last/avg/p50/p95.
+
+    Values are multiplied by `scale` for display and keys get a `_<unit>` suffix,
+    so latencies recorded in seconds read back as `*_ms`.
+    """
+
+    def __init__(self, window: int = 500, scale: float = 1.0, unit: str = ""):
+        self.count = 0
+        self.scale = scale
+        self.suffix = f"_{unit}" if unit else ""
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, value: float):
+        self.count += 1
+        self._samples.append(value)
+
+    def summary(self) -> Dict:
+        if not self._samples:
+            return {"count": self.count}
+        ordered = sorted(self._samples)
+
+        def show(value: float) -> float:
+            return round(value * self.scale, 1)
+
+        def percentile(p: float) -> float:
+            return show(ordered[min(len(ordered) - 1, int(p * len(ordered)))])
+
+        return {
+            "count": self.count,
+            f"last{self.suffix}": show(self._samples[-1]),
+            f"avg{self.suffix}": show(sum(ordered) / len(ordered)),
+            f"p50{self.suffix}": percentile(0.50),
+            f"p95{self.suffix}": percentile(0.95)
+        }
+
+
+class SampleRegistry:
+    """Named SampleStats, created on first use"""
+
+    def __init__(self, scale: float = 1.0, unit: str = ""):
+        self.scale = scale
+        self.unit = unit
+        self._stats: Dict[str, SampleStats] = {}
+
+    def record(self, name: str, value: float):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = SampleStats(scale=self.scale, unit=self.unit)
+        stats.record(value)
+
+    def snapshot(self) -> Dict:
+        return {name: stats.summary() for name, stats in sorted(self._stats.items())}
+
+
+# Time to first token and total latency of streamed LLM replies, keyed "<model>.<metric>"
+llm_latency = SampleRegistry(scale=1000, unit="ms")
+
+# Prompt and reply sizes per LLM call, keyed "<call>.input" / "<call>.output"
+llm_tokens = SampleRegistry(unit="tokens")
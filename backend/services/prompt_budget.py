@@ -0,0 +1,111 @@
+import logging
+from functools import lru_cache
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+ENCODING = "cl100k_base"
+ELLIPSIS = "…"
+
+# Without an encoding, English prose averages about four characters per token
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, or None when tiktoken or its BPE file is unavailable"""
+    if tiktoken is None:
+        logger.warning("tiktoken not installed; estimating prompt tokens from length")
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating prompt tokens from length: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to at most `max_tokens` tokens, marking the cut with an ellipsis"""
+    text = " ".join(text.split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        cut = text[:(max_tokens - 1) * _CHARS_PER_TOKEN]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens - 1])
+    return cut.rstrip() + ELLIPSIS
+
+
+def fit_headings(headings: List[str], per_heading: int) -> List[str]:
+    """Whitespace-folded, de-duplicated headings, each cut to `per_heading` tokens"""
+    seen = set()
+    fitted = []
+    for heading in headings:
+        heading = truncate_tokens(heading, per_heading)
+        if heading and heading.lower() not in seen:
+            seen.add(heading.lower())
+            fitted.append(heading)
+    return fitted
+
+
+class PromptFields:
+    """Page fields for the analyzer prompt, fitted to a token budget.
+
+    Each field is first folded and cut to its own cap, repeated headings are
+    dropped, and if the total still exceeds `budget` the least useful content
+    goes first: trailing H2s, then trailing H1s, then the meta description.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        title_tokens: int = 48,
+        meta_tokens: int = 120,
+        heading_tokens: int = 24,
+    ):
+        self.budget = budget
+        self.title_tokens = title_tokens
+        self.meta_tokens = meta_tokens
+        self.heading_tokens = heading_tokens
+
+    def fit(self, scraped_data: Dict) -> Dict:
+        title = truncate_tokens(scraped_data.get('title') or 'N/A', self.title_tokens)
+        meta = truncate_tokens(scraped_data.get('meta_description') or 'N/A', self.meta_tokens)
+        h1_tags = fit_headings(scraped_data.get('h1_tags', []), self.heading_tokens)
+        h2_tags = fit_headings(scraped_data.get('h2_tags', []), self.heading_tokens)
+
+        def total() -> int:
+            return sum(count_tokens(text) for text in [title, meta, *h1_tags, *h2_tags])
+
+        while total() > self.budget and h2_tags:
+            h2_tags.pop()
+        while total() > self.budget and len(h1_tags) > 1:
+            h1_tags.pop()
+        overflow = total() - self.budget
+        if overflow > 0:
+            meta = truncate_tokens(meta, max(count_tokens(meta) - overflow, 0)) or 'N/A'
+
+        return {
+            "title": title,
+            "meta_description": meta,
+            "h1_tags": h1_tags,
+            "h2_tags": h2_tags
+        }
+
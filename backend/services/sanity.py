@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from services.fetcher import HTTP2_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+_GROQ_SPACE_RE = re.compile(r'\s+')
+
+
+def groq(template: str) -> str:
+    """Compile a GROQ template once: collapse its layout whitespace so the
+    query string sent on every request is as short as possible.
+
+    Values are never formatted into templates; pass them as `$params` to `fetch`.
+    """
+    return _GROQ_SPACE_RE.sub(' ', template).strip()
+
+
+class SanityClient:
+    """One pooled HTTP/2 connection to the Sanity query API for the whole app.
+
+    Configuration is read from the environment once, in `start()` (called from
+    the app lifespan, after .env has been loaded), and the keep-alive pool is
+    closed by `aclose()` on shutdown.
+    """
+
+    def __init__(self):
+        self.project_id: Optional[str] = None
+        self.dataset = "production"
+        self.api_version = "v2025-02-19"
+        self.base_url: Optional[str] = None
+        self.cdn_url: Optional[str] = None
+        self.use_cdn = False
+        self.headers: Dict[str, str] = {}
+        self.webhook_secret: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cdn_bypass_until = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return self.base_url is not None
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self.project_id = os.getenv("SANITY_PROJECT_ID")
+        token = os.getenv("SANITY_API_TOKEN")
+        self.dataset = os.getenv("SANITY_DATASET", "production")
+        self.api_version = os.getenv("SANITY_API_VERSION", "v2025-02-19")
+
+        if not self.project_id:
+            logger.warning("SANITY_PROJECT_ID not configured")
+
+        self.base_url = f"https://{self.project_id}.api.sanity.io/{self.api_version}" if self.project_id else None
+        self.cdn_url = f"https://{self.project_id}.apicdn.sanity.io/{self.api_version}" if self.project_id else None
+        self.use_cdn = os.getenv("SANITY_USE_CDN", "false").lower() in ("1", "true", "yes")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.webhook_secret = os.getenv("SANITY_WEBHOOK_SECRET") or None
+
+        max_connections = int(os.getenv("SANITY_MAX_CONNECTIONS", "20"))
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(float(os.getenv("SANITY_TIMEOUT", "30")), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=int(os.getenv("SANITY_MAX_KEEPALIVE", str(max_connections))),
+                keepalive_expiry=float(os.getenv("SANITY_KEEPALIVE_EXPIRY", "90")),
+            ),
+        )
+        logger.info(f"Sanity client started (http2={HTTP2_AVAILABLE}, cdn={self.use_cdn}, dataset={self.dataset})")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def bypass_cdn(self, seconds: float):
+        """Send reads to the live API for a while, e.g. just after a content change
+        that the CDN may not have caught up with yet"""
+        self._cdn_bypass_until = max(self._cdn_bypass_until, time.monotonic() + seconds)
+
+    async def fetch(self, query: str, params: Optional[Dict[str, Any]] = None, cdn: bool = False) -> Any:
+        """Execute a GROQ query against Sanity
+
+        `params` are sent as GROQ `$name` parameters (JSON-encoded, as the HTTP
+        API expects). With `cdn=True` and SANITY_USE_CDN enabled, the read goes
+        to the edge-cached apicdn host; only use it for published content.
+        """
+        if not self.base_url:
+            raise HTTPException(
+                status_code=503,
+                detail="Sanity is not configured. Please add SANITY_PROJECT_ID to environment variables."
+            )
+        if self._client is None:
+            raise RuntimeError("Sanity client is not started")
+
+        use_cdn = cdn and self.use_cdn and time.monotonic() >= self._cdn_bypass_until
+        url = f"{self.cdn_url if use_cdn else self.base_url}/data/query/{self.dataset}"
+        query_params = {"query": query, "perspective": "published"}
+        for name, value in (params or {}).items():
+            query_params[f"${name}"] = json.dumps(value)
+
+        try:
+            response = await self._client.get(url, params=query_params, headers=self.headers)
+            response.raise_for_status()
+            return response.json()["result"]
+        except httpx.HTTPError as e:
+            logger.error(f"Sanity query failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch from Sanity: {str(e)}")
+
+    async def fetch_asset(self, filename: str, max_bytes: int) -> bytes:
+        """Download an image asset of this project's dataset from cdn.sanity.io.
+
+        Assets are public, so no token is sent. Raises 404 for a missing asset
+        and 413 when it is larger than `max_bytes`.
+        """
+        if not self.project_id:
+            raise HTTPException(status_code=503, detail="Sanity is not configured")
+        if self._client is None:
+            raise RuntimeError("Sanity client is not started")
+
+        url = f"https://cdn.sanity.io/images/{self.project_id}/{self.dataset}/{filename}"
+        try:
+            async with self._client.stream("GET", url) as response:
+                if response.status_code == 404:
+                    raise HTTPException(status_code=404, detail="Image not found")
+                response.raise_for_status()
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise HTTPException(status_code=413, detail="Image is too large")
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        except httpx.HTTPError as e:
+            logger.error(f"Sanity asset download failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch image from Sanity: {str(e)}")
+
+
+def sign_webhook(body: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """`sanity-webhook-signature` header value for a payload, as Sanity computes it.
+
+    The signature is an HMAC-SHA256 of "<timestamp>.<body>" in unpadded base64url,
+    where the timestamp is in milliseconds.
+    """
+    timestamp = int(time.time() * 1000) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).digest()
+    signature = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+    return f"t={timestamp},v1={signature}"
+
+
+def verify_webhook(body: bytes, header: Optional[str], secret: str, tolerance: float = 300) -> bool:
+    """Check a webhook signature header, rejecting timestamps more than `tolerance` seconds off"""
+    if not header:
+        return False
+    parts = dict(part.strip().split("=", 1) for part in header.split(",") if "=" in part)
+    try:
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() * 1000 - timestamp) > tolerance * 1000:
+        return False
+    expected = sign_webhook(body, secret, timestamp)
+    return hmac.compare_digest(expected, f"t={timestamp},v1={parts.get('v1', '')}")
+
+
+sanity_client = SanityClient()
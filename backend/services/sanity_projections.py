@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# Projection profiles per document type: output field -> GROQ projection entry.
+# `detail` is the full, fully dereferenced shape the routes have always returned;
+# `card` keeps only what list views render, with the same field names so a card
+# is a subset of the detail shape.
+PROFILES: Dict[str, Dict[str, Dict[str, str]]] = {
+    "blogPost": {
+        "detail": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "excerpt": "excerpt",
+            "publishedAt": "publishedAt",
+            "author": "author->",
+            "categories": "categories[]->",
+            "mainImage": "mainImage { asset-> }"
+        },
+        "card": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "excerpt": "excerpt",
+            "publishedAt": "publishedAt",
+            "author": "author->{ _id, name }",
+            "categories": "categories[]->{ _id, title, slug }",
+            "mainImage": "mainImage { alt, asset->{ _id, url, metadata { lqip, dimensions } } }"
+        }
+    },
+    "service": {
+        "detail": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "description": "description",
+            "icon": "icon { asset-> }",
+            "features": "features[]",
+            "price": "price"
+        },
+        "card": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "description": "description",
+            "icon": "icon { asset->{ _id, url } }",
+            "price": "price"
+        }
+    },
+    "portfolioPiece": {
+        "detail": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "description": "description",
+            "image": "image { asset-> }",
+            "technologies": "technologies[]",
+            "featured": "featured",
+            "projectUrl": "projectUrl"
+        },
+        "card": {
+            "_id": "_id",
+            "title": "title",
+            "slug": "slug",
+            "image": "image { alt, asset->{ _id, url, metadata { lqip, dimensions } } }",
+            "featured": "featured"
+        }
+    }
+}
+
+PROFILE_PATTERN = "^(card|detail)$"
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """`fields=title,slug` query value as a normalized tuple (empty means all)"""
+    if not fields:
+        return ()
+    return tuple(sorted({name.strip() for name in fields.split(",") if name.strip()}))
+
+
+@lru_cache(maxsize=128)
+def projection(doc_type: str, profile: str, fields: Tuple[str, ...] = (), required: Tuple[str, ...] = ("_id",)) -> str:
+    """Compiled GROQ projection for a profile, optionally narrowed to `fields`.
+
+    `required` fields are always included. Raises ValueError naming any field
+    the profile does not have.
+    """
+    entries = PROFILES[doc_type][profile]
+    if fields:
+        unknown = [name for name in fields if name not in entries]
+        if unknown:
+            raise ValueError(f"Unknown fields for {profile} {doc_type}: {', '.join(unknown)}")
+        selected = [name for name in entries if name in fields or name in required]
+    else:
+        selected = list(entries)
+    return "{ " + ", ".join(name if entries[name] == name else f'"{name}": {entries[name]}' for name in selected) + " }"
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+ProgressCallback = Callable[[str, Dict], Awaitable[None]]
+
+
+class _Flight:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.events: List[Tuple[str, Dict]] = []
+        self.listeners: List[ProgressCallback] = []
+        self.waiters = 0
+        self.lock = asyncio.Lock()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one running task.
+
+    The first caller for a key starts `fn(progress)`; callers arriving while it
+    runs wait for the same result instead of starting their own. Progress events
+    are broadcast to every caller, and a late joiner first gets the events it
+    missed. The shared task is cancelled only when every caller has gone away.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable[[ProgressCallback], Awaitable[Any]],
+        progress: Optional[ProgressCallback] = None,
+    ) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            self.started += 1
+
+            async def broadcast(stage: str, payload: Dict):
+                async with flight.lock:
+                    flight.events.append((stage, payload))
+                    for listener in list(flight.listeners):
+                        await listener(stage, payload)
+
+            flight.task = asyncio.create_task(fn(broadcast))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            if progress:
+                async with flight.lock:
+                    for stage, payload in flight.events:
+                        await progress(stage, payload)
+                    flight.listeners.append(progress)
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            if progress in flight.listeners:
+                flight.listeners.remove(progress)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List, Optional
+
+
+class KeyedSlots:
+    """Per-key concurrency limit, e.g. requests per host.
+
+    A key's semaphore exists only while some caller holds or waits for one of
+    its slots, so the map does not grow with every key ever seen.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        # key -> [semaphore, callers holding or waiting]
+        self._slots: Dict[Hashable, List] = {}
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable, shared: Optional[asyncio.Semaphore] = None):
+        """Hold one of `key`'s slots, then (if given) one of the `shared` slots.
+
+        The per-key slot is taken first, so callers queued behind a busy key
+        never sit on a shared slot that callers for other keys could use.
+        """
+        entry = self._slots.get(key)
+        if entry is None:
+            entry = self._slots[key] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                if shared is None:
+                    yield
+                else:
+                    async with shared:
+                        yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._slots.get(key) is entry:
+                del self._slots[key]
+
+    def __len__(self) -> int:
+        return len(self._slots)
@@ -0,0 +1,15 @@
+import json
+from typing import Dict, Optional
+
+# Keep proxies (nginx, Vercel) from buffering or caching event streams
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_sse(data: Dict, event: Optional[str] = None) -> str:
+    """Encode one Server-Sent Events frame with a JSON `data:` line"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
@@ -0,0 +1,66 @@
+import asyncio
+import contextlib
+import re
+from typing import AsyncIterator
+
+_END = object()
+
+_WORD_RE = re.compile(r'\s*\S+\s*')
+
+
+async def coalesce(chunks: AsyncIterator[str], max_buffered: int = 64, max_chars: int = 4096) -> AsyncIterator[str]:
+    """Relay text chunks, merging whatever piled up while the consumer was busy.
+
+    A pump task reads `chunks` into a bounded queue. When the consumer keeps up,
+    every chunk is passed on as soon as it arrives; when it falls behind, the
+    waiting chunks are joined into one (up to `max_chars`), so a slow client gets
+    fewer, larger writes. Once `max_buffered` chunks are waiting the pump stops
+    reading, which pushes back on the upstream. Closing this generator cancels
+    the pump and with it the upstream iterator.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+
+    async def pump():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await queue.get()
+            parts = []
+            size = 0
+            while isinstance(item, str):
+                parts.append(item)
+                size += len(item)
+                if size >= max_chars or queue.empty():
+                    item = None
+                    break
+                item = queue.get_nowait()
+            if parts:
+                yield ''.join(parts)
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def replay(text: str, chunk_chars: int = 24, delay: float = 0.03) -> AsyncIterator[str]:
+    """Re-stream stored text in word-aligned chunks of about `chunk_chars`, `delay` seconds apart"""
+    chunk = ''
+    for match in _WORD_RE.finditer(text):
+        chunk += match.group()
+        if len(chunk) >= chunk_chars:
+            yield chunk
+            chunk = ''
+            await asyncio.sleep(delay)
+    if chunk:
+        yield chunk
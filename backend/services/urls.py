@@ -0,0 +1,44 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_SCHEME_RE = re.compile(r'^https?://', re.IGNORECASE)
+
+# Query parameters that only identify a campaign or click, never the page itself
+TRACKING_PARAMS = frozenset([
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'twclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref', 'ref_src'
+])
+
+
+def ensure_scheme(url: str) -> str:
+    """Prefix bare hostnames with https://, as the analyzer always has"""
+    url = url.strip()
+    if not _SCHEME_RE.match(url):
+        url = 'https://' + url
+    return url
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical form of a site URL, used to key cached and in-flight analyses.
+
+    Scheme is folded to https, the host is lower-cased with any leading `www.` and
+    default port removed, trailing slashes and fragments are dropped and tracking
+    parameters (utm_*, gclid, ...) are stripped from a sorted query string.
+    """
+    parts = urlsplit(ensure_scheme(url))
+
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if parts.port and parts.port not in (80, 443):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip('/') or '/'
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+
+    return urlunsplit(('https', netloc, path, urlencode(sorted(query)), ''))
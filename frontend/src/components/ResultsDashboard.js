@@ -4,10 +4,15 @@ import ScoreCard from './ScoreCard';
 import GrowthChart from './GrowthChart';
 import ConsultationForm from './ConsultationForm';
 
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || '';
+
 function ResultsDashboard({ results, onReset }) {
   if (!results) return null;
 
-  const { analysis, overall_score, mockup_image, url } = results;
+  const { analysis, overall_score, mockup_url, mockup_image, url } = results;
+  const mockupSrc = mockup_url
+    ? `${BACKEND_URL}${mockup_url}`
+    : mockup_image && `data:image/png;base64,${mockup_image}`;
 
   return (
     <div className="results-dashboard" data-testid="results-dashboard">
@@ -92,13 +97,13 @@ function ResultsDashboard({ results, onReset }) {
           </div>
         </div>
 
-        {mockup_image && (
+        {mockupSrc && (
           <div className="mockup-section card">
             <h3>AI-Generated Redesign Mockup</h3>
             <p className="mockup-description">{analysis.redesign_description}</p>
             <div className="mockup-container">
               <img 
-                src={`data:image/png;base64,${mockup_image}`} 
+                src={mockupSrc} 
                 alt="Redesigned website mockup" 
                 className="mockup-image"
                 data-testid="mockup-image"
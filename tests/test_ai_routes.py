@@ -0,0 +1,116 @@
+"""AI demo routes: the streamed assistant chat and the multiplexed model battle."""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from routes import ai as ai_routes  # noqa: E402
+
+
+def parse(frame):
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    return json.loads(frame[len("data: "):])
+
+
+class FakeModels:
+    """stream_chat stand-in: claude completes, gpt raises mid-reply, gemini stalls"""
+
+    def __init__(self):
+        self.closed = []
+
+    async def stream_chat(self, provider, model, system_message, messages):
+        try:
+            await asyncio.sleep(0.02)
+            yield f"{provider} says "
+            if provider == "openai":
+                raise RuntimeError("provider error")
+            if provider == "gemini":
+                await asyncio.sleep(10)
+            await asyncio.sleep(0.02)
+            yield "hello"
+        finally:
+            self.closed.append(provider)
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = FakeModels()
+    monkeypatch.setattr(ai_routes, "stream_chat", models.stream_chat)
+    monkeypatch.setattr(ai_routes, "BATTLE_MODEL_TIMEOUT", 0.2)
+    ai_routes.reply_cache.clear()
+    yield models
+    ai_routes.reply_cache.clear()
+
+
+async def collect(frames):
+    return [parse(frame) async for frame in frames]
+
+
+def test_claude_stream_sends_tokens_then_done(models):
+    app = FastAPI()
+    app.include_router(ai_routes.router)
+    with TestClient(app) as client:
+        response = client.post("/api/ai/claude/stream", json={"messages": [{"role": "user", "content": "Hi"}]})
+        rejected = client.post("/api/ai/claude/stream", json={"messages": [{"role": "assistant", "content": "Hi"}]})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [parse(frame + "\n\n") for frame in response.text.split("\n\n") if frame]
+    assert [frame["token"] for frame in frames[:-1]] == ["anthropic says ", "hello"]
+    done = frames[-1]
+    assert done["done"] is True and done["cached"] is False
+    assert 20 <= done["ttft_ms"] <= done["total_ms"]
+    assert rejected.status_code == 400
+
+
+def test_each_lane_ends_on_its_own(models):
+    frames = asyncio.run(collect(ai_routes.battle_events(["claude", "gpt", "gemini"], "Pitch us")))
+    by_model = {}
+    for frame in frames[:-1]:
+        by_model.setdefault(frame["model"], []).append(frame)
+
+    assert by_model["claude"][-1]["response"] == "anthropic says hello"
+    assert by_model["gpt"][-1] == {"model": "gpt", "error": "Model unavailable"}
+    assert by_model["gemini"][-1] == {"model": "gemini", "error": "Timed out", "partial": "gemini says "}
+
+    done = frames[-1]
+    assert done["done"] is True
+    results = done["results"]
+    assert {alias: result["status"] for alias, result in results.items()} == {
+        "claude": "complete", "gpt": "failed", "gemini": "timeout"
+    }
+    claude = results["claude"]
+    assert 20 <= claude["ttft_ms"] < claude["total_ms"] < 200
+    assert claude["cached"] is False
+    assert results["gemini"]["ttft_ms"] >= 20 and results["gemini"]["total_ms"] is None
+    assert results["gpt"]["total_ms"] is None
+    assert sorted(models.closed) == ["anthropic", "gemini", "openai"]
+
+
+def test_completed_reply_is_replayed_from_cache(models, monkeypatch):
+    monkeypatch.setattr(ai_routes, "REPLY_REPLAY_DELAY", 0)
+    asyncio.run(collect(ai_routes.battle_events(["claude"], "Pitch us")))
+    frames = asyncio.run(collect(ai_routes.battle_events(["claude"], "pitch   US")))
+    assert frames[-2]["response"] == "anthropic says hello" and frames[-2]["cached"] is True
+    assert frames[-1]["results"]["claude"]["cached"] is True
+    assert models.closed == ["anthropic"]
+
+
+def test_client_disconnect_cancels_every_lane(models, monkeypatch):
+    monkeypatch.setattr(ai_routes, "BATTLE_MODEL_TIMEOUT", 60)
+
+    async def scenario():
+        frames = ai_routes.battle_events(["claude", "gpt", "gemini"], "Pitch us")
+        await frames.__anext__()
+        await frames.aclose()
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        assert sorted(models.closed) == ["anthropic", "gemini", "openai"]
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert pending == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,246 @@
+"""Stale-while-revalidate behaviour of SWRCache."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import cache as cache_module
+from services.cache import SWRCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class Source:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return f"v{self.calls}"
+
+
+def test_fresh_entries_are_served_from_memory(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        assert await cache.get("k", source.fetch) == "v1"
+        clock.now += 30
+        assert await cache.get("k", source.fetch) == "v1"
+        assert source.calls == 1
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_while_refreshing(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("k", source.fetch)
+        clock.now += 120
+        assert await cache.get("k", source.fetch) == "v1"
+        assert await cache.get("k", source.fetch) == "v1"
+        await asyncio.sleep(0.01)
+        assert source.calls == 2
+        assert await cache.get("k", source.fetch) == "v2"
+        assert cache.stats()["stale_hits"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_expired_entry_waits_for_fetch(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("k", source.fetch)
+        clock.now += 1000
+        assert await cache.get("k", source.fetch) == "v2"
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        results = await asyncio.gather(*[cache.get("k", source.fetch) for _ in range(5)])
+        assert results == ["v1"] * 5
+        assert source.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_falls_back_to_last_good_value(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("k", source.fetch)
+        source.fail = True
+        clock.now += 5000
+        assert await cache.get("k", source.fetch) == "v1"
+        assert cache.stats()["fallbacks"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_background_refresh_keeps_stale_value(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("k", source.fetch)
+        source.fail = True
+        clock.now += 120
+        assert await cache.get("k", source.fetch) == "v1"
+        await asyncio.sleep(0.01)
+        assert cache.stats()["refresh_errors"] == 1
+        assert await cache.get("k", source.fetch) == "v1"
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_without_value_raises(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        source.fail = True
+        with pytest.raises(RuntimeError):
+            await cache.get("k", source.fetch)
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=2, ttl=60, stale_ttl=600), Source()
+        await cache.get("a", source.fetch)
+        await cache.get("b", source.fetch)
+        await cache.get("a", source.fetch)
+        await cache.get("c", source.fetch)
+        assert len(cache) == 2
+        await cache.get("b", source.fetch)
+        assert source.calls == 4
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_drops_tagged_entries(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("posts", source.fetch, tags=("blogPost", "author"))
+        await cache.get("services", source.fetch, tags=("service",))
+        assert cache.invalidate("author") == 1
+        assert await cache.get("posts", source.fetch) == "v3"
+        assert await cache.get("services", source.fetch) == "v2"
+
+    asyncio.run(scenario())
+
+
+def test_revalidate_refetches_in_place(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        await cache.get("posts", source.fetch, tags=("blogPost",))
+        assert cache.revalidate("blogPost") == 1
+        assert await cache.get("posts", source.fetch) == "v1"
+        await asyncio.sleep(0.01)
+        assert await cache.get("posts", source.fetch) == "v2"
+        assert cache.revalidate("service") == 0
+
+    asyncio.run(scenario())
+
+
+def test_fetch_started_before_invalidation_is_not_stored(clock):
+    async def scenario():
+        cache = SWRCache(maxsize=8, ttl=60, stale_ttl=600)
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            await release.wait()
+            return "old"
+
+        pending = asyncio.ensure_future(cache.get("posts", slow_fetch, tags=("blogPost",)))
+        await asyncio.sleep(0)
+        cache.clear()
+        release.set()
+        assert await pending == "old"
+        assert len(cache) == 0
+
+    asyncio.run(scenario())
+
+
+def test_revalidate_paces_refreshes(clock):
+    async def scenario():
+        cache = SWRCache(maxsize=32, ttl=60, stale_ttl=600, max_refreshes=3)
+        calls = {}
+        running, peak = [0], [0]
+
+        def fetcher(key):
+            async def fetch():
+                calls[key] = calls.get(key, 0) + 1
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.005)
+                running[0] -= 1
+                return f"{key}-v{calls[key]}"
+            return fetch
+
+        for i in range(12):
+            await cache.get(i, fetcher(i), tags=["blogPost"])
+        peak[0] = 0
+        assert cache.revalidate("blogPost") == 12
+        # Queued refreshes keep serving the current value
+        assert await cache.get(11, fetcher(11)) == "11-v1"
+        while cache._inflight:
+            await asyncio.sleep(0.005)
+        assert peak[0] == 3
+        assert [await cache.get(i, fetcher(i)) for i in range(12)] == [f"{i}-v2" for i in range(12)]
+
+    asyncio.run(scenario())
+
+
+def test_invalidated_keys_leave_no_state_behind(clock):
+    async def scenario():
+        cache, source = SWRCache(maxsize=8, ttl=60, stale_ttl=600), Source()
+        for i in range(1000):
+            await cache.get(f"cursor-{i}", source.fetch, tags=("blogPost",))
+            cache.invalidate("blogPost")
+        for i in range(100):
+            await cache.get(f"category-{i}", source.fetch)
+            cache.clear()
+        assert len(cache) == 0
+        assert not any(isinstance(value, dict) and value for value in vars(cache).values())
+
+    asyncio.run(scenario())
+
+
+def test_refetch_supersedes_an_earlier_inflight_fetch(clock):
+    async def scenario():
+        cache = SWRCache(maxsize=8, ttl=60, stale_ttl=600)
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            await release.wait()
+            return "old"
+
+        async def fresh_fetch():
+            return "new"
+
+        await cache.get("posts", fresh_fetch, tags=("blogPost",))
+        clock.now += 120
+        cache._refresh("posts", slow_fetch, frozenset({"blogPost"}))
+        assert cache.revalidate("blogPost") == 1
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.sleep(0.01)
+        assert await cache.get("posts", fresh_fetch) == "new"
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+"""Disk store: byte cap, LRU eviction order and rebuilding the index from disk."""
+import asyncio
+import os
+
+from services.disk_store import DiskStore
+
+
+def key(n):
+    return f"{n:064x}"
+
+
+def make_store(tmp_path, max_bytes=300):
+    store = DiskStore(str(tmp_path), max_bytes=max_bytes)
+    store.load()
+    return store
+
+
+def age_files(store, keys):
+    """Give files distinct mtimes, oldest first, as if written over time"""
+    for offset, k in enumerate(keys):
+        os.utime(store.path_for(k), (1_000_000 + offset, 1_000_000 + offset))
+
+
+def test_put_evicts_least_recently_used_over_the_cap(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        for n in range(3):
+            await store.put(key(n), b"x" * 100)
+        assert await store.get(key(0)) == b"x" * 100
+
+        await store.put(key(3), b"y" * 100)
+        assert key(1) not in store and not os.path.exists(store.path_for(key(1)))
+        assert [k in store for k in map(key, (0, 2, 3))] == [True, True, True]
+        assert store.stats()["bytes"] == 300
+
+        # Replacing a file counts only its new size
+        await store.put(key(3), b"z" * 50)
+        assert (store.stats()["files"], store.stats()["bytes"]) == (3, 250)
+
+    asyncio.run(scenario())
+
+
+def test_file_larger_than_the_cap_is_kept_alone(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.put(key(0), b"x" * 100)
+        await store.put(key(1), b"x" * 500)
+        assert key(0) not in store and key(1) in store
+
+    asyncio.run(scenario())
+
+
+def test_load_rebuilds_the_index_in_mtime_order(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path, max_bytes=1000)
+        for n in range(3):
+            await store.put(key(n), b"x" * 100)
+        age_files(store, [key(1), key(0), key(2)])
+        (tmp_path / "notes.txt").write_text("not a stored file")
+        (tmp_path / f"{key(9)}.png.123.tmp").write_bytes(b"partial write")
+
+        reloaded = make_store(tmp_path, max_bytes=200)
+        assert list(reloaded._index) == [key(0), key(2)]
+        assert reloaded.stats()["bytes"] == 200
+        assert not os.path.exists(store.path_for(key(1)))
+        assert sorted(os.listdir(tmp_path)) == sorted(["notes.txt", f"{key(0)}.png", f"{key(2)}.png"])
+
+    asyncio.run(scenario())
+
+
+def test_lookup_hits_survive_a_restart(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        for n in range(3):
+            await store.put(key(n), b"x" * 100)
+        age_files(store, [key(0), key(1), key(2)])
+
+        assert await store.lookup(key(0))
+        assert not await store.lookup(key(7))
+        assert (store.stats()["hits"], store.stats()["misses"]) == (1, 1)
+
+        reloaded = make_store(tmp_path)
+        await reloaded.put(key(3), b"y" * 100)
+        assert key(0) in reloaded and key(1) not in reloaded
+
+    asyncio.run(scenario())
+
+
+def test_missing_file_is_forgotten(tmp_path):
+    async def scenario():
+        store = make_store(tmp_path)
+        await store.put(key(0), b"x" * 100)
+        os.remove(store.path_for(key(0)))
+        assert not await store.lookup(key(0))
+        assert await store.open(key(0)) is None
+        assert store.stats()["bytes"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+"""Fetch engine: DNS cache with address fallback, per-host slots and the httpx transport."""
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import httpcore
+import httpx
+import pytest
+
+from services import fetcher as fetcher_module
+from services.fetcher import FetchEngine, _CachingNetworkBackend
+from services.slots import KeyedSlots
+
+
+class FakeBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self, reachable):
+        self.reachable = reachable
+        self.attempts = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.attempts.append(host)
+        if host not in self.reachable:
+            raise httpcore.ConnectError(f"{host} unreachable")
+        return host
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise NotImplementedError
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    answers = {"example.com": ["2001:db8::1", "203.0.113.7", "203.0.113.7"]}
+    lookups = []
+
+    async def getaddrinfo(loop, host, port, type=None):
+        lookups.append(host)
+        return [(None, type, 6, "", (address, port)) for address in answers[host]]
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", getaddrinfo)
+    return lookups
+
+
+def test_connect_falls_back_to_the_next_address(resolver):
+    async def scenario():
+        backend = FakeBackend(reachable={"203.0.113.7"})
+        network = _CachingNetworkBackend(backend, ttl=60)
+        assert await network.connect_tcp("example.com", 443) == "203.0.113.7"
+        assert await network.connect_tcp("example.com", 443) == "203.0.113.7"
+        assert backend.attempts == ["2001:db8::1", "203.0.113.7"] * 2
+        assert resolver == ["example.com"]
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_host_raises_and_forgets_the_answer(resolver):
+    async def scenario():
+        network = _CachingNetworkBackend(FakeBackend(reachable=set()), ttl=60)
+        with pytest.raises(httpcore.ConnectError):
+            await network.connect_tcp("example.com", 443)
+        assert network._cache == {}
+
+    asyncio.run(scenario())
+
+
+def test_resolver_failures_are_connect_errors(monkeypatch):
+    async def scenario():
+        answers = {"empty.example": []}
+
+        async def getaddrinfo(loop, host, port, type=None):
+            if host not in answers:
+                raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            return answers[host]
+
+        monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", getaddrinfo)
+        network = _CachingNetworkBackend(FakeBackend(reachable=set()), ttl=60)
+        for host in ("missing.example", "empty.example"):
+            with pytest.raises(httpcore.ConnectError):
+                await network.connect_tcp(host, 443)
+        assert network._cache == {}
+
+        engine = FetchEngine(timeout=5)
+        await engine.start()
+        try:
+            with pytest.raises(httpx.ConnectError):
+                async with engine.stream("http://missing.example/"):
+                    pass
+        finally:
+            await engine.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_expired_answers_are_evicted(resolver, monkeypatch):
+    async def scenario():
+        now = [1000.0]
+        monkeypatch.setattr(fetcher_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        network = _CachingNetworkBackend(FakeBackend(reachable={"203.0.113.7"}), ttl=60)
+        await network.connect_tcp("example.com", 443)
+        await network.connect_tcp("example.com", 80)
+        now[0] += 61
+        await network._resolve("127.0.0.1", 80)
+        assert len(network._cache) == 2
+        await network.connect_tcp("example.com", 443)
+        assert list(network._cache) == [("example.com", 443)]
+
+    asyncio.run(scenario())
+
+
+def test_keyed_slots_limit_and_drop_idle_keys():
+    async def scenario():
+        slots = KeyedSlots(limit=2)
+        running = []
+        peak = []
+
+        async def work(key):
+            async with slots.slot(key):
+                running.append(key)
+                peak.append(running.count(key))
+                await asyncio.sleep(0.01)
+                running.remove(key)
+
+        await asyncio.gather(*(work("a") for _ in range(5)), work("b"))
+        assert max(peak) == 2
+        assert len(slots) == 0
+
+    asyncio.run(scenario())
+
+
+def test_engine_fetches_over_the_caching_transport():
+    async def scenario():
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\nConnection: close\r\n\r\nhello")
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        engine = FetchEngine(timeout=5)
+        await engine.start()
+        try:
+            async with engine.stream(f"http://localhost:{port}/") as response:
+                assert response.status_code == 200
+                assert await response.aread() == b"hello"
+            assert len(engine._host_slots) == 0
+
+            server.close()
+            await server.wait_closed()
+            with pytest.raises(httpx.ConnectError):
+                async with engine.stream(f"http://127.0.0.1:{port}/"):
+                    pass
+        finally:
+            await engine.aclose()
+
+    asyncio.run(scenario())
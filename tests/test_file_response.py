@@ -0,0 +1,91 @@
+"""File responses: conditional GETs, byte ranges and If-Range."""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services.file_response import etag_matches, parse_range, serve_file
+
+BODY = bytes(range(256)) * 4
+ETAG = '"abc123"'
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(BODY)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return serve_file(request, str(path), len(BODY), ETAG, "image/png", "public, max-age=60")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('header,expected', [
+    (None, False),
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"other", "abc123"', True),
+    ('*', True),
+    ('"abc"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.mark.parametrize('header,expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=1000-', (1000, 1023)),
+    ('bytes=1000-5000', (1000, 1023)),
+    ('bytes=-100', (924, 1023)),
+    ('bytes=-5000', (0, 1023)),
+    ('bytes=0-1,5-6', None),
+    ('items=0-1', None),
+    ('bytes=-', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1024-', 'bytes=2000-3000', 'bytes=10-5', 'bytes=-0'])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_range(header, len(BODY))
+
+
+def test_full_body(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["etag"] == ETAG and response.headers["accept-ranges"] == "bytes"
+
+
+def test_not_modified(client):
+    response = client.get("/file", headers={"If-None-Match": ETAG, "Range": "bytes=0-9"})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_suffix_range(client):
+    response = client.get("/file", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.content == BODY[-24:]
+    assert response.headers["content-range"] == "bytes 1000-1023/1024"
+    assert response.headers["content-length"] == "24"
+
+
+def test_range_starting_past_the_end(client):
+    response = client.get("/file", headers={"Range": "bytes=4096-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_if_range(client):
+    matching = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": ETAG})
+    assert matching.status_code == 206 and matching.content == BODY[10:20]
+
+    # A stale validator means the client's partial copy is outdated: send everything
+    stale = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == BODY
@@ -0,0 +1,162 @@
+"""Parity tests: the streaming extractor must match the BeautifulSoup scraper it replaced."""
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+from services.html_signals import SignalExtractor, extract_signals
+
+URL = 'https://example.com'
+
+
+def reference_signals(html, url):
+    """The original scrape_website parsing code, kept verbatim as the oracle"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    data = {
+        'url': url,
+        'title': soup.title.string if soup.title else 'No title',
+        'meta_description': '',
+        'h1_tags': [],
+        'h2_tags': [],
+        'has_viewport': False,
+        'has_canonical': False,
+        'og_image': '',
+        'link_count': 0,
+        'image_count': 0,
+        'has_nav': False,
+        'has_footer': False,
+        'has_form': False
+    }
+
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc:
+        data['meta_description'] = meta_desc.get('content', '')
+
+    data['h1_tags'] = [h1.get_text(strip=True) for h1 in soup.find_all('h1')[:3]]
+    data['h2_tags'] = [h2.get_text(strip=True) for h2 in soup.find_all('h2')[:5]]
+
+    viewport = soup.find('meta', attrs={'name': 'viewport'})
+    data['has_viewport'] = viewport is not None
+
+    canonical = soup.find('link', attrs={'rel': 'canonical'})
+    data['has_canonical'] = canonical is not None
+
+    og_img = soup.find('meta', attrs={'property': 'og:image'})
+    if og_img:
+        data['og_image'] = og_img.get('content', '')
+
+    data['link_count'] = len(soup.find_all('a'))
+    data['image_count'] = len(soup.find_all('img'))
+    data['has_nav'] = soup.find('nav') is not None
+    data['has_footer'] = soup.find('footer') is not None
+    data['has_form'] = soup.find('form') is not None
+
+    return data
+
+
+MARKETING_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>Acme Dental &amp; Ortho | Smile Brighter</title>
+  <meta name="description" content="Family dentistry in Springfield &mdash; book online.">
+  <meta property="og:image" content="https://example.com/og.png">
+  <link rel="stylesheet" href="/app.css">
+  <link rel="canonical" href="https://example.com/">
+  <style>h1 { color: red; }</style>
+  <script>var x = "<h1>not a heading</h1>";</script>
+</head>
+<body>
+  <nav><a href="/">Home</a><a href="/about">About</a></nav>
+  <h1>  Welcome to <span>Acme</span>
+      Dental </h1>
+  <h2>Services</h2><h2>Our <em>Team</em></h2><h2>Reviews</h2>
+  <h2>Pricing</h2><h2>FAQ</h2><h2>Contact</h2>
+  <img src="a.png"><img src="b.png"/><svg><title>icon</title></svg>
+  <form action="/book"><input name="email"><button>Book</button></form>
+  <footer><p>&copy; 2025 Acme</p><a href="/privacy">Privacy</a></footer>
+</body>
+</html>"""
+
+CASES = [
+    MARKETING_PAGE,
+    '',
+    'plain text, no markup at all',
+    '<title></title>',
+    '<title> </title>',
+    '<title>\n\n</title>',
+    '<title><!--c--></title>',
+    '<title><!----></title>',
+    '<title><b>x</b></title>',
+    '<title>a<b>x</b></title>',
+    '<title>&lt;t&gt; &#150; &#x2014; &foo; &amp</title>',
+    '<title>first</title><title>second</title>',
+    '<title>never closed <h1>still in title</h1>',
+    '<h1>a<![CDATA[x]]>b</h1>',
+    '<h1>a<script>s</script><style>t</style><template>u<b>v</b></template>'
+    '<ruby>r<rt>q</rt><rp>p</rp></ruby></h1>',
+    '<h1> Hello <!--c--> World </h1>',
+    '<h1>outer<h1>inner</h1>tail</h1><h1>third</h1><h1>fourth</h1>',
+    '<div><h1>closed by div</div>after',
+    '<h1>unclosed heading <p>with a paragraph',
+    '<h1/>text<h2/>',
+    '<h1><br>a<br/>b</h1>',
+    '<h1><pre>  \n  </pre>x</h1>',
+    '<h2><svg><title>s</title></svg>T</h2>',
+    '<meta name="description"><meta name="description" content="second">',
+    '<meta name=description content>',
+    '<meta name="Description" content="wrong case"><meta property="og:image">',
+    '<meta name="description" name="viewport" content="dupe">',
+    '<link rel="alternate canonical">',
+    '<link rel="Canonical">',
+    '<link rel=" canonical\t">',
+    '<link rel>',
+    '<A href=x>upper</A><IMG src=y><NAV></NAV><Footer></Footer><FORM></FORM>',
+    '<p>stray</p></h1></title><h1>ok</h1>',
+    '<textarea><h1>raw</h1></textarea>',
+]
+
+
+@pytest.mark.parametrize('html', CASES)
+def test_matches_reference(html):
+    assert extract_signals(html, URL) == reference_signals(html, URL)
+
+
+def test_marketing_page_values():
+    data = extract_signals(MARKETING_PAGE, URL)
+    assert data['title'] == 'Acme Dental & Ortho | Smile Brighter'
+    assert data['h1_tags'] == ['Welcome toAcmeDental']
+    assert data['h2_tags'] == ['Services', 'OurTeam', 'Reviews', 'Pricing', 'FAQ']
+    assert data['link_count'] == 3
+    assert data['image_count'] == 2
+    assert data['has_canonical'] and data['has_viewport']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 4096])
+def test_chunked_feed_matches_single_feed(chunk_size):
+    extractor = SignalExtractor(URL)
+    for start in range(0, len(MARKETING_PAGE), chunk_size):
+        extractor.feed(MARKETING_PAGE[start:start + chunk_size])
+    extractor.close()
+    assert extractor.data == extract_signals(MARKETING_PAGE, URL)
+
+
+FRAGMENTS = [
+    '<h1>', '</h1>', '<h2>', '</h2>', '<title>', '</title>', '<div>', '</div>', '<p>', '</p>',
+    '<span>', '</span>', '<a href="#">', '</a>', '<img src="x">', '<br>', '<br/>', '<nav>',
+    '</nav>', '<footer>', '</footer>', '<form>', '</form>', '<script>x</script>',
+    '<style>y</style>', '<template>', '</template>', '<pre>', '</pre>', '<!-- c -->', '<!---->',
+    '<![CDATA[cd]]>', '<?pi x?>', '&amp;', '&nbsp;', '&#150;', '&bogus;', ' ', '\n', '  \t',
+    'word', 'Two words', '<meta name="description" content="d">', '<meta name="viewport">',
+    '<meta property="og:image" content="i.png">', '<link rel="canonical">', '<svg>', '</svg>',
+]
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_tag_soup_matches_reference(seed):
+    rng = random.Random(seed)
+    html = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 80)))
+    assert extract_signals(html, URL) == reference_signals(html, URL)
+
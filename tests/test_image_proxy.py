@@ -0,0 +1,166 @@
+"""Sanity image proxy: resizing, format negotiation, disk caching and srcset links."""
+import io
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from routes import sanity as sanity_routes
+from services import image_proxy as image_proxy_module
+from services.disk_store import DiskStore
+from services.image_proxy import ImageProxy, media_type_of, negotiate_format, render_variant
+from services.sanity import sanity_client
+
+QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+FILENAME = "0a1b2c-2000x1000.jpg"
+ASSET_URL = f"https://cdn.sanity.io/images/proj/production/{FILENAME}"
+
+
+def encode(image, fmt, **options):
+    out = io.BytesIO()
+    image.save(out, format=fmt, **options)
+    return out.getvalue()
+
+
+def decode(data):
+    return Image.open(io.BytesIO(data))
+
+
+@pytest.fixture
+def proxy(tmp_path, monkeypatch):
+    store = DiskStore(str(tmp_path), max_bytes=10 * 1024 * 1024, extension=".img")
+    store.load()
+    proxy = ImageProxy(store, widths=[320, 640, 1280], max_source_bytes=1024 * 1024, concurrency=1, quality=QUALITY)
+    monkeypatch.setattr(sanity_client, "project_id", "proj")
+    monkeypatch.setattr(sanity_client, "dataset", "production")
+    return proxy
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    calls = []
+    source = encode(Image.new("RGB", (2000, 1000), (200, 40, 40)), "JPEG")
+
+    async def fetch_asset(filename, max_bytes):
+        calls.append(filename)
+        return source
+
+    monkeypatch.setattr(sanity_client, "fetch_asset", fetch_asset)
+    return calls
+
+
+@pytest.fixture
+def client(proxy, monkeypatch):
+    monkeypatch.setattr(sanity_routes, "image_proxy", proxy)
+    app = FastAPI()
+    app.include_router(sanity_routes.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_render_scales_down_and_never_up():
+    source = encode(Image.new("RGB", (2000, 1000), "white"), "JPEG")
+    small = decode(render_variant(source, 640, "webp", QUALITY))
+    assert (small.format, small.size) == ("WEBP", (640, 320))
+    assert decode(render_variant(source, 4000, "jpeg", QUALITY)).size == (2000, 1000)
+
+
+def test_render_applies_exif_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    source = encode(Image.new("RGB", (1200, 600), "white"), "JPEG", exif=exif)
+    assert decode(render_variant(source, 300, "jpeg", QUALITY)).size == (300, 600)
+
+
+def test_legacy_format_keeps_transparency():
+    transparent = encode(Image.new("RGBA", (800, 800), (0, 0, 0, 0)), "PNG")
+    opaque = encode(Image.new("RGB", (800, 800), "white"), "PNG")
+    assert media_type_of(render_variant(transparent, 320, "legacy", QUALITY)) == "image/png"
+    assert media_type_of(render_variant(opaque, 320, "legacy", QUALITY)) == "image/jpeg"
+
+
+def test_negotiate_format(monkeypatch):
+    monkeypatch.setattr(image_proxy_module, "AVIF_AVAILABLE", True)
+    monkeypatch.setattr(image_proxy_module, "WEBP_AVAILABLE", True)
+    assert negotiate_format("image/avif,image/webp,image/apng,*/*;q=0.8") == "avif"
+    assert negotiate_format("image/webp,*/*") == "webp"
+    assert negotiate_format("*/*") == "legacy"
+    assert negotiate_format(None) == "legacy"
+
+
+def test_widths_snap_to_configured_sizes(proxy):
+    assert [proxy.snap_width(w) for w in (1, 320, 321, 5000, None)] == [320, 320, 640, 1280, 1280]
+
+
+def test_sources_stop_at_the_original_width(proxy):
+    base = "https://api.example.com"
+    sources = proxy.sources("https://cdn.sanity.io/images/proj/production/abc-500x300.png", base)
+    assert sources == {
+        "src": f"{base}/api/sanity/images/abc-500x300.png?w=640",
+        "srcset": f"{base}/api/sanity/images/abc-500x300.png?w=320 320w, {base}/api/sanity/images/abc-500x300.png?w=640 500w"
+    }
+    assert proxy.sources("https://cdn.sanity.io/images/other/production/abc-500x300.png", base) is None
+    assert proxy.sources("https://cdn.sanity.io/images/proj/production/abc-500x300.svg", base) is None
+    assert proxy.sources("https://cdn.sanity.io/images/proj/production/abc-500x300.gif", base) is None
+
+
+def test_add_sources_annotates_nested_images(proxy):
+    posts = [{"title": "Post", "mainImage": {"alt": "Hero", "asset": {"_id": "image-abc", "url": ASSET_URL}}}]
+    proxy.add_sources(posts, "https://api.example.com")
+    image = posts[0]["mainImage"]
+    assert image["src"] == f"https://api.example.com/api/sanity/images/{FILENAME}?w=1280"
+    assert image["srcset"].count("w,") == 2
+
+
+def test_content_links_use_the_configured_origin(client, proxy, monkeypatch):
+    queries = []
+
+    async def fetch(query, params=None, cdn=False):
+        queries.append(query)
+        return [{"_id": "svc-1", "icon": {"asset": {"_id": "image-abc", "url": ASSET_URL}}}]
+
+    monkeypatch.setattr(sanity_client, "fetch", fetch)
+    sanity_routes.sanity_cache.clear()
+    # Without a configured public origin no links are added, whatever the Host header says
+    icon = client.get("/api/sanity/services", headers={"Host": "evil.example"}).json()["data"][0]["icon"]
+    assert "src" not in icon and "srcset" not in icon
+
+    monkeypatch.setattr(proxy, "base_url", "https://api.example.com")
+    sanity_routes.sanity_cache.clear()
+    for host in ("a.example", "b.example"):
+        icon = client.get("/api/sanity/services", headers={"Host": host}).json()["data"][0]["icon"]
+        assert icon["src"] == f"https://api.example.com/api/sanity/images/{FILENAME}?w=1280"
+        assert icon["srcset"].startswith(f"https://api.example.com/api/sanity/images/{FILENAME}?w=320 320w, ")
+    # The Host header is not part of the cache key
+    assert len(queries) == 2
+    sanity_routes.sanity_cache.clear()
+
+
+def test_variant_is_rendered_once_and_served_from_disk(client, downloads):
+    headers = {"Accept": "image/webp,*/*"}
+    first = client.get(f"/api/sanity/images/{FILENAME}", params={"w": 600}, headers=headers)
+    assert first.headers["content-type"] == "image/webp"
+    assert first.headers["vary"] == "Accept" and "immutable" in first.headers["cache-control"]
+    assert decode(first.content).size == (640, 320)
+
+    second = client.get(f"/api/sanity/images/{FILENAME}", params={"w": 640}, headers=headers)
+    assert second.content == first.content
+    assert downloads == [FILENAME]
+
+    revalidated = client.get(
+        f"/api/sanity/images/{FILENAME}",
+        params={"w": 640},
+        headers={**headers, "If-None-Match": first.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+    legacy = client.get(f"/api/sanity/images/{FILENAME}", params={"w": 640}, headers={"Accept": "*/*"})
+    assert legacy.headers["content-type"] == "image/jpeg"
+    assert len(downloads) == 2
+
+
+def test_non_asset_paths_are_rejected(client, downloads):
+    for filename in ["logo.svg", "..%2Fsecret", "0a1b2c-10x10.svg", "0a1b2c-10x10.gif"]:
+        assert client.get(f"/api/sanity/images/{filename}").status_code == 404
+    assert downloads == []
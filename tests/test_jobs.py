@@ -0,0 +1,89 @@
+"""Background job queue: backlog limit, worker outcomes and pre-finished jobs."""
+import asyncio
+
+import pytest
+
+from services.jobs import JobQueue
+
+
+def make_queue(handler, workers=1, max_queued=2):
+    return JobQueue(handler, workers=workers, max_queued=max_queued, ttl=60)
+
+
+def test_submit_raises_queue_full_at_capacity():
+    async def scenario():
+        jobs = make_queue(lambda job: asyncio.sleep(0))
+        first = jobs.submit({"url": "https://a.example"})
+        jobs.submit({"url": "https://b.example"})
+        with pytest.raises(asyncio.QueueFull):
+            jobs.submit({"url": "https://c.example"})
+        assert jobs.get(first.id).status == "queued"
+        assert jobs.stats() == {"workers": 1, "queued": 2, "tracked": 2}
+
+    asyncio.run(scenario())
+
+
+def test_worker_completes_and_fails_jobs():
+    async def handler(job):
+        job.update("scraping", step=1)
+        if job.payload["url"].endswith("bad"):
+            raise ValueError("boom")
+
+    async def scenario():
+        jobs = make_queue(handler)
+        await jobs.start()
+        try:
+            good = jobs.submit({"url": "https://ok"})
+            bad = jobs.submit({"url": "https://bad"})
+            await jobs._queue.join()
+        finally:
+            await jobs.stop()
+        assert (good.status, good.result, good.error) == ("complete", {"step": 1}, None)
+        assert (bad.status, bad.error) == ("failed", "boom")
+        assert bad.to_dict()["result"] == {"step": 1}
+
+    asyncio.run(scenario())
+
+
+def test_add_finished_is_readable_without_a_worker():
+    jobs = make_queue(lambda job: asyncio.sleep(0), max_queued=1)
+    job = jobs.add_finished({"url": "https://a.example"}, {"overall_score": 80, "cached": True})
+    assert jobs.get(job.id) is job
+    assert job.done and job.to_dict()["result"] == {"overall_score": 80, "cached": True}
+    assert jobs.stats()["queued"] == 0
+
+
+def test_finished_jobs_never_evict_pending_ones():
+    jobs = JobQueue(lambda job: asyncio.sleep(0), workers=1, max_queued=2, ttl=60, max_jobs=3)
+    pending = jobs.submit({"url": "https://slow.example"})
+    for i in range(10):
+        jobs.add_finished({"url": f"https://{i}.example"}, {"cached": True})
+    assert jobs.get(pending.id) is pending
+    assert jobs.stats()["tracked"] == 4
+
+
+def test_full_backlog_returns_503(monkeypatch):
+    pytest.importorskip("emergentintegrations")
+    from fastapi.testclient import TestClient
+
+    import server
+
+    monkeypatch.setattr(server, "analysis_jobs", make_queue(lambda job: asyncio.sleep(0), max_queued=1))
+    client = TestClient(server.app)
+    first = client.post("/api/analyze/jobs", json={"url": "a.example", "force_refresh": True})
+    second = client.post("/api/analyze/jobs", json={"url": "b.example", "force_refresh": True})
+    assert first.status_code == 202 and first.json()["status"] == "queued"
+    assert second.status_code == 503
+
+
+@pytest.mark.parametrize("url", ["http://[bad", "example.com:abc"])
+def test_malformed_url_returns_400(url):
+    pytest.importorskip("emergentintegrations")
+    from fastapi.testclient import TestClient
+
+    import server
+
+    client = TestClient(server.app)
+    assert client.post("/api/analyze/jobs", json={"url": url}).status_code == 400
+    assert client.post("/api/analyze", json={"url": url}).status_code == 400
+    assert client.post("/api/analyze/stream", json={"url": url}).status_code == 400
@@ -0,0 +1,71 @@
+"""Incremental parsing of streamed JSON analysis replies."""
+import json
+
+import pytest
+
+from services.json_stream import JSONObjectStream
+
+ANALYSIS = {
+    "business_type": "local_business",
+    "visual_score": 62,
+    "ux_score": 55.5,
+    "seo_score": 40,
+    "exposure_score": 35,
+    "redesign_description": "A bold hero with \"Book now\" {CTA}, a [services] grid,\nand reviews.",
+    "ai_assistants": ["Booking bot", "FAQ assistant"],
+    "nested": {"a": [1, {"b": "}"}], "c": None},
+    "done": True
+}
+
+
+def fenced(text):
+    return f"Here is the analysis:\n```json\n{text}\n```\nLet me know if you need more."
+
+
+@pytest.mark.parametrize("wrap", [lambda t: t, fenced, lambda t: f"```\n{t}\n```"])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_whole_reply(wrap, indent):
+    parser = JSONObjectStream()
+    fields = parser.feed(wrap(json.dumps(ANALYSIS, indent=indent)))
+    assert parser.done
+    assert parser.result == ANALYSIS
+    assert [key for key, _ in fields] == list(ANALYSIS)
+
+
+@pytest.mark.parametrize("size", [1, 3, 17])
+def test_chunked_reply_emits_fields_in_order(size):
+    text = fenced(json.dumps(ANALYSIS, indent=2))
+    parser = JSONObjectStream()
+    seen = []
+    for i in range(0, len(text), size):
+        seen.extend(parser.feed(text[i:i + size]))
+    assert dict(seen) == ANALYSIS
+    assert [key for key, _ in seen] == list(ANALYSIS)
+
+
+def test_scores_arrive_before_object_ends():
+    text = json.dumps(ANALYSIS)
+    cut = text.index('"redesign_description"')
+    parser = JSONObjectStream()
+    fields = dict(parser.feed(text[:cut]))
+    assert not parser.done
+    assert {"visual_score", "ux_score", "seo_score", "exposure_score"} <= set(fields)
+
+
+def test_text_after_object_is_ignored():
+    parser = JSONObjectStream()
+    parser.feed('{"a": 1}')
+    assert parser.feed(', "b": 2}') == []
+    assert parser.result == {"a": 1}
+
+
+def test_incomplete_reply_is_not_done():
+    parser = JSONObjectStream()
+    parser.feed('```json\n{"a": 1, "b": [1, 2')
+    assert not parser.done
+    assert parser.result == {"a": 1}
+
+
+def test_invalid_member_raises():
+    with pytest.raises(json.JSONDecodeError):
+        JSONObjectStream().feed('{"a": nope, "b": 1}')
@@ -0,0 +1,111 @@
+"""LLM client pool: session checkout, reset on check-in, discard on error and idle expiry."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from services import llm_pool as llm_pool_module  # noqa: E402
+from services.llm_pool import LLMClientPool  # noqa: E402
+
+
+class FakeChat:
+    def __init__(self, api_key, session_id, system_message):
+        self.messages = [{"role": "system", "content": system_message}]
+
+    def with_model(self, provider, model):
+        return self
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setenv("EMERGENT_LLM_KEY", "test-key")
+    monkeypatch.setattr(llm_pool_module, "LlmChat", FakeChat)
+    monkeypatch.setattr(llm_pool_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+async def borrow(pool, turns=1, system_message="system"):
+    async with pool.chat("anthropic", "claude", system_message) as chat:
+        chat.messages.extend({"role": "user", "content": "hi"} for _ in range(turns))
+        return chat
+
+
+def test_session_is_reused_with_its_turns_reset(clock):
+    async def scenario():
+        pool = LLMClientPool(max_idle=2, idle_ttl=60, health_interval=60)
+        first = await borrow(pool, turns=3)
+        assert len(first.messages) == 1
+        second = await borrow(pool)
+        assert second is first
+        other = await borrow(pool, system_message="other")
+        assert other is not first
+        assert pool.stats() == {"idle": 2, "in_use": 0, "created": 2, "reused": 1, "discarded": 0}
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_callers_get_separate_sessions(clock):
+    async def scenario():
+        pool = LLMClientPool(max_idle=1, idle_ttl=60, health_interval=60)
+        async with pool.chat("anthropic", "claude", "system") as a:
+            async with pool.chat("anthropic", "claude", "system") as b:
+                assert a is not b
+                assert pool.stats()["in_use"] == 2
+        # Only `max_idle` sessions are kept per key
+        assert pool.stats()["idle"] == 1 and pool.stats()["discarded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_session_is_discarded_after_an_error(clock):
+    async def scenario():
+        pool = LLMClientPool(max_idle=2, idle_ttl=60, health_interval=60)
+        with pytest.raises(RuntimeError):
+            async with pool.chat("anthropic", "claude", "system"):
+                raise RuntimeError("provider error")
+        assert pool.stats()["idle"] == 0 and pool.stats()["discarded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_session_without_a_message_list_is_not_pooled(clock, monkeypatch):
+    class OpaqueChat(FakeChat):
+        def __init__(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(llm_pool_module, "LlmChat", OpaqueChat)
+
+    async def scenario():
+        pool = LLMClientPool(max_idle=2, idle_ttl=60, health_interval=60)
+        async with pool.chat("anthropic", "claude", "system"):
+            pass
+        assert pool.stats()["idle"] == 0 and pool.stats()["discarded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_idle_sessions_expire(clock):
+    async def scenario():
+        pool = LLMClientPool(max_idle=2, idle_ttl=60, health_interval=60)
+        first = await borrow(pool)
+        clock.now += 61
+        assert await borrow(pool) is not first
+        assert pool.stats()["discarded"] == 1
+
+        clock.now += 61
+        pool.check_health()
+        assert pool.stats()["idle"] == 0 and pool.stats()["discarded"] == 2
+        assert pool._idle == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+"""Token budgeting of the analyzer prompt fields."""
+from services.prompt_budget import ELLIPSIS, PromptFields, count_tokens, fit_headings, truncate_tokens
+
+
+def test_short_text_is_only_folded():
+    assert truncate_tokens("  Acme \n  Plumbing  ", 50) == "Acme Plumbing"
+
+
+def test_truncate_respects_budget():
+    text = "plumber emergency repair near me " * 400
+    cut = truncate_tokens(text, 30)
+    assert cut.endswith(ELLIPSIS)
+    assert count_tokens(cut) <= 31
+
+
+def test_headings_are_deduplicated():
+    headings = ["Best Plumber", "best   plumber", "BEST PLUMBER", "Contact Us"]
+    assert fit_headings(headings, 10) == ["Best Plumber", "Contact Us"]
+
+
+def test_ordinary_page_is_unchanged():
+    page = {
+        "title": "Acme Plumbing | Emergency Repairs",
+        "meta_description": "Licensed plumbers serving the metro area 24/7.",
+        "h1_tags": ["Fast, friendly plumbing"],
+        "h2_tags": ["Services", "Reviews", "Contact"]
+    }
+    fitted = PromptFields(budget=400).fit(page)
+    assert fitted["title"] == page["title"]
+    assert fitted["meta_description"] == page["meta_description"]
+    assert fitted["h1_tags"] == page["h1_tags"]
+    assert fitted["h2_tags"] == page["h2_tags"]
+
+
+def test_stuffed_page_fits_budget():
+    stuffed = "cheap plumber best plumber plumbing deals " * 200
+    page = {
+        "title": stuffed,
+        "meta_description": stuffed * 3,
+        "h1_tags": [f"{stuffed} {i}" for i in range(3)],
+        "h2_tags": [f"{stuffed} {i}" for i in range(5)]
+    }
+    fitted = PromptFields(budget=150).fit(page)
+    texts = [fitted["title"], fitted["meta_description"], *fitted["h1_tags"], *fitted["h2_tags"]]
+    assert sum(count_tokens(text) for text in texts) <= 150
+    assert len(fitted["h1_tags"]) >= 1
+    assert fitted["title"].endswith(ELLIPSIS)
+
+
+def test_missing_fields_fall_back():
+    fitted = PromptFields(budget=100).fit({})
+    assert fitted["title"] == "N/A"
+    assert fitted["meta_description"] == "N/A"
+    assert fitted["h1_tags"] == [] and fitted["h2_tags"] == []
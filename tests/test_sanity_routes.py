@@ -0,0 +1,213 @@
+"""Sanity content routes: caching, conditional GETs and webhook refreshes."""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import sanity as sanity_routes
+from services.sanity import sanity_client, sign_webhook
+
+SECRET = "dev-secret"
+
+
+class FakeSanity:
+    def __init__(self):
+        self.queries = []
+        self.services = [{"_id": "svc-1", "title": "AI Assistants"}, {"_id": "svc-2", "title": "Web Apps"}]
+        # Several posts share a publishedAt so the _id tie-break matters
+        self.posts = [
+            {"_id": f"post-{i:02d}", "title": f"Post {i}", "publishedAt": f"2026-0{1 + i // 4}-01T00:00:00Z"}
+            for i in range(23)
+        ]
+
+    async def fetch(self, query, params=None, cdn=False):
+        self.queries.append((query, params, cdn))
+        if query.startswith("{"):
+            bundle = {"services": list(self.services), "portfolio": list(self.services)}
+            if "blogPost" in query:
+                bundle["posts"] = self.blog_page(params)
+            return {name: items for name, items in bundle.items() if f'"{name}":' in query}
+        if "blogPost" in query:
+            return self.blog_page(params)
+        return list(self.services)
+
+    def blog_page(self, params):
+        """Evaluate the blog page query the way Sanity would"""
+        posts = sorted(self.posts, key=lambda post: (post["publishedAt"], post["_id"]), reverse=True)
+        if "afterId" in params:
+            after = (params["afterPublishedAt"], params["afterId"])
+            posts = [post for post in posts if (post["publishedAt"], post["_id"]) < after]
+        return posts[:params["limit"]]
+
+
+@pytest.fixture
+def sanity(monkeypatch):
+    fake = FakeSanity()
+    monkeypatch.setattr(sanity_client, "fetch", fake.fetch)
+    monkeypatch.setattr(sanity_client, "webhook_secret", SECRET)
+    sanity_routes.sanity_cache.clear()
+    return fake
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(sanity_routes.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def post_webhook(client, payload, secret=SECRET, **params):
+    body = json.dumps(payload).encode("utf-8")
+    return client.post(
+        "/api/sanity/webhook",
+        params=params,
+        content=body,
+        headers={"sanity-webhook-signature": sign_webhook(body, secret), "Content-Type": "application/json"}
+    )
+
+
+def test_content_is_cached(client, sanity):
+    first = client.get("/api/sanity/services")
+    second = client.get("/api/sanity/services")
+    assert first.json() == {"success": True, "data": sanity.services, "count": 2}
+    assert second.content == first.content
+    assert len(sanity.queries) == 1
+
+
+def test_conditional_get_returns_304(client, sanity):
+    response = client.get("/api/sanity/services")
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and "stale-while-revalidate" in response.headers["cache-control"]
+
+    revalidated = client.get("/api/sanity/services", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+def test_webhook_invalidates_by_type(client, sanity):
+    etag = client.get("/api/sanity/services").headers["etag"]
+    sanity.services.append({"_id": "svc-3", "title": "Automations"})
+
+    response = post_webhook(client, {"_id": "svc-3", "_type": "service"}, mode="invalidate")
+    assert response.json() == {"success": True, "type": "service", "mode": "invalidate", "affected": 1}
+
+    refreshed = client.get("/api/sanity/services", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["count"] == 3
+
+
+def test_webhook_for_other_type_leaves_cache(client, sanity):
+    client.get("/api/sanity/services")
+    assert post_webhook(client, {"_type": "portfolioPiece"}).json()["affected"] == 0
+    client.get("/api/sanity/services")
+    assert len(sanity.queries) == 1
+
+
+def test_webhook_rejects_bad_signature(client, sanity):
+    assert post_webhook(client, {"_type": "service"}, secret="wrong").status_code == 401
+
+
+def test_webhook_requires_type(client, sanity):
+    assert post_webhook(client, {"_id": "x"}).status_code == 400
+
+
+def test_values_are_sent_as_groq_params(client, sanity):
+    hostile = '" in x] | {"leak": *[_type == "secret"]} | [0'
+    client.get("/api/sanity/blog-posts", params={"category": hostile, "limit": 5})
+    client.get("/api/sanity/blog-posts", params={"category": "ai", "limit": 3})
+    (first, first_params, cdn), (second, second_params, _) = sanity.queries
+    assert first == second
+    assert hostile not in first and "$category" in first and "$limit" in first
+    assert first_params == {"category": hostile, "limit": 6}
+    assert second_params == {"category": "ai", "limit": 4}
+    assert cdn
+
+
+def test_cache_is_keyed_by_params(client, sanity):
+    client.get("/api/sanity/portfolio")
+    client.get("/api/sanity/portfolio", params={"featured": "true"})
+    client.get("/api/sanity/portfolio")
+    assert [params for _, params, _ in sanity.queries] == [{"featured": False}, {"featured": True}]
+
+
+def test_cursor_pages_walk_every_post_once(client, sanity):
+    seen = []
+    cursor = None
+    for _ in range(10):
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/sanity/blog-posts", params=params).json()
+        seen.extend(post["_id"] for post in body["data"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted((post["_id"] for post in sanity.posts), reverse=True)
+    assert body["count"] == 3
+
+
+def test_page_asks_for_one_extra_post(client, sanity):
+    body = client.get("/api/sanity/blog-posts", params={"limit": 23}).json()
+    assert body["count"] == 23 and body["next_cursor"] is None
+    assert sanity.queries[-1][1]["limit"] == 24
+
+
+def test_invalid_cursor_is_rejected(client, sanity):
+    for cursor in ["not-base64!", "bnVsbA", "WzEsMl0"]:
+        assert client.get("/api/sanity/blog-posts", params={"cursor": cursor}).status_code == 400
+
+
+def test_detail_profile_is_the_default(client, sanity):
+    client.get("/api/sanity/blog-posts")
+    client.get("/api/sanity/blog-posts", params={"profile": "detail"})
+    assert len(sanity.queries) == 1
+    assert '"author": author->' in sanity.queries[0][0]
+
+
+def test_card_profile_projects_lean_references(client, sanity):
+    client.get("/api/sanity/blog-posts", params={"profile": "card"})
+    query = sanity.queries[-1][0]
+    assert '"author": author->{ _id, name }' in query
+    assert "asset->{ _id, url, metadata { lqip, dimensions } }" in query
+
+
+def test_fields_narrow_the_projection(client, sanity):
+    client.get("/api/sanity/services", params={"fields": "title, slug"})
+    assert sanity.queries[-1][0].endswith("{ _id, title, slug }")
+
+    # The cursor is built from publishedAt, so blog pages always select it
+    body = client.get("/api/sanity/blog-posts", params={"fields": "title", "limit": 2}).json()
+    assert sanity.queries[-1][0].endswith("{ _id, title, publishedAt }")
+    assert body["next_cursor"] is not None
+
+
+def test_unknown_field_or_profile_is_rejected(client, sanity):
+    assert client.get("/api/sanity/portfolio", params={"fields": "title,body"}).status_code == 400
+    assert client.get("/api/sanity/portfolio", params={"profile": "card", "fields": "technologies"}).status_code == 400
+    assert client.get("/api/sanity/services", params={"profile": "full"}).status_code == 422
+    assert sanity.queries == []
+
+
+def test_bundle_is_one_sanity_query(client, sanity):
+    body = client.get("/api/sanity/bundle", params={"limit": 3, "featured": "true"}).json()
+    assert len(sanity.queries) == 1
+    query, params, cdn = sanity.queries[0]
+    assert query.startswith('{ "services": *[_type == "service"]') and cdn
+    assert params == {"featured": True, "limit": 4}
+    assert body["count"] == {"services": 2, "portfolio": 2, "posts": 3}
+    assert [post["_id"] for post in body["data"]["posts"]] == ["post-22", "post-21", "post-20"]
+
+    # The cursor continues the bundle's posts on /blog-posts
+    page = client.get("/api/sanity/blog-posts", params={"limit": 3, "cursor": body["next_cursor"]}).json()
+    assert page["data"][0]["_id"] == "post-19"
+
+
+def test_bundle_sections_and_refresh(client, sanity):
+    body = client.get("/api/sanity/bundle", params={"include": "services"}).json()
+    assert list(body["data"]) == ["services"] and body["next_cursor"] is None
+    assert sanity.queries[0][1] == {}
+    assert client.get("/api/sanity/bundle", params={"include": "services,hero"}).status_code == 400
+
+    assert post_webhook(client, {"_type": "author"}).json()["affected"] == 0
+    assert post_webhook(client, {"_type": "service"}, mode="invalidate").json()["affected"] == 1
@@ -0,0 +1,35 @@
+"""Sanity webhook signatures."""
+import time
+
+from services.sanity import sign_webhook, verify_webhook
+
+SECRET = "dev-secret"
+BODY = b'{"_id": "post-1", "_type": "blogPost"}'
+
+
+def test_signature_round_trips():
+    assert verify_webhook(BODY, sign_webhook(BODY, SECRET), SECRET)
+
+
+def test_signature_format():
+    header = sign_webhook(BODY, SECRET, timestamp=1700000000000)
+    timestamp, signature = header.split(",")
+    assert timestamp == "t=1700000000000"
+    assert signature.startswith("v1=") and "=" not in signature[3:]
+
+
+def test_wrong_secret_or_body_is_rejected():
+    header = sign_webhook(BODY, SECRET)
+    assert not verify_webhook(BODY, header, "other-secret")
+    assert not verify_webhook(BODY + b" ", header, SECRET)
+
+
+def test_old_timestamp_is_rejected():
+    old = int((time.time() - 3600) * 1000)
+    assert not verify_webhook(BODY, sign_webhook(BODY, SECRET, old), SECRET)
+
+
+def test_missing_or_malformed_header_is_rejected():
+    assert not verify_webhook(BODY, None, SECRET)
+    assert not verify_webhook(BODY, "v1=abc", SECRET)
+    assert not verify_webhook(BODY, "t=soon,v1=abc", SECRET)
@@ -0,0 +1,129 @@
+"""Single-flight coalescing of concurrent calls for one key."""
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        runs = []
+
+        async def fn(progress):
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flights.run("key", fn) for _ in range(3)), flights.run("other", fn))
+        assert results == ["result"] * 4
+        assert len(runs) == 2
+        assert flights.stats() == {"in_flight": 0, "started": 2, "coalesced": 2}
+
+        # Once finished, the next call starts a fresh run
+        await flights.run("key", fn)
+        assert len(runs) == 3
+
+    asyncio.run(scenario())
+
+
+def test_late_joiner_gets_missed_events_first():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        first_seen, late_seen = [], []
+
+        async def fn(progress):
+            await progress("scraping", {"n": 1})
+            await progress("analyzing", {"n": 2})
+            await release.wait()
+            await progress("complete", {"n": 3})
+            return "done"
+
+        async def record(seen, stage, payload):
+            seen.append(stage)
+
+        first = asyncio.create_task(flights.run("key", fn, lambda s, p: record(first_seen, s, p)))
+        while len(first_seen) < 2:
+            await asyncio.sleep(0)
+        late = asyncio.create_task(flights.run("key", fn, lambda s, p: record(late_seen, s, p)))
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(first, late) == ["done", "done"]
+        assert first_seen == late_seen == ["scraping", "analyzing", "complete"]
+
+    asyncio.run(scenario())
+
+
+def test_shared_task_survives_until_the_last_waiter_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fn(progress):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(flights.run("key", fn))
+        second = asyncio.create_task(flights.run("key", fn))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+        assert flights.stats()["in_flight"] == 1
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        assert flights.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fn(progress):
+            await asyncio.sleep(0.01)
+            raise ValueError("scrape failed")
+
+        results = await asyncio.gather(flights.run("key", fn), flights.run("key", fn), return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 1}
+
+    asyncio.run(scenario())
+
+
+def test_listener_is_removed_after_leaving():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        seen = []
+
+        async def fn(progress):
+            await release.wait()
+            await progress("complete", {})
+            return "done"
+
+        async def record(stage, payload):
+            seen.append(stage)
+
+        shared = asyncio.create_task(flights.run("key", fn))
+        leaver = asyncio.create_task(flights.run("key", fn, record))
+        await asyncio.sleep(0)
+        leaver.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        release.set()
+        assert await shared == "done"
+        assert seen == []
+
+    asyncio.run(scenario())
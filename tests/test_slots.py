@@ -0,0 +1,44 @@
+"""Per-key slots combined with a shared limit, as batch analysis uses them."""
+import asyncio
+
+from services.slots import KeyedSlots
+
+
+def run_batch(domains, concurrency, per_domain, duration=0.02):
+    """Run one fake analysis per domain entry; returns (peak concurrency, start offset per index)"""
+    async def scenario():
+        shared = asyncio.Semaphore(concurrency)
+        slots = KeyedSlots(per_domain)
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        running = [0]
+        peak = [0]
+        started = {}
+
+        async def analyze(index, domain):
+            async with slots.slot(domain, shared):
+                started[index] = loop.time() - begin
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(duration)
+                running[0] -= 1
+
+        await asyncio.gather(*(analyze(i, domain) for i, domain in enumerate(domains)))
+        assert len(slots) == 0
+        return peak[0], started
+
+    return asyncio.run(scenario())
+
+
+def test_busy_domain_does_not_hold_shared_slots():
+    domains = ["a"] * 10 + ["b"] * 4
+    peak, started = run_batch(domains, concurrency=8, per_domain=2)
+    assert peak == 4
+    # b's first URL starts right away instead of waiting behind a's queue
+    assert started[10] < 0.01
+
+
+def test_shared_limit_still_applies():
+    domains = [f"site-{i}" for i in range(12)]
+    peak, _ = run_batch(domains, concurrency=3, per_domain=2)
+    assert peak == 3
@@ -0,0 +1,120 @@
+"""Chunk relaying and paced replay of stored replies."""
+import asyncio
+
+import pytest
+
+from services.streaming import coalesce, replay
+
+TEXT = "Our AI avatar answers questions,\nbooks calls and   qualifies leads around the clock."
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_replay_round_trips_text():
+    chunks = asyncio.run(collect(replay(TEXT, chunk_chars=10, delay=0)))
+    assert ''.join(chunks) == TEXT
+    assert len(chunks) > 1
+    assert all(len(chunk) >= 10 for chunk in chunks[:-1])
+
+
+def test_replay_keeps_words_whole():
+    chunks = asyncio.run(collect(replay(TEXT, chunk_chars=1, delay=0)))
+    assert [chunk.strip() for chunk in chunks] == TEXT.split()
+
+
+def test_replay_empty_text():
+    assert asyncio.run(collect(replay("", delay=0))) == []
+
+
+def test_coalesced_replay_round_trips_text():
+    chunks = asyncio.run(collect(coalesce(replay(TEXT, chunk_chars=5, delay=0))))
+    assert ''.join(chunks) == TEXT
+
+
+class Upstream:
+    """Endless chunk source that records how far it got and whether it was closed"""
+
+    def __init__(self, delay=0.0, limit=None):
+        self.delay = delay
+        self.limit = limit
+        self.produced = 0
+        self.closed = False
+
+    async def chunks(self):
+        try:
+            while self.limit is None or self.produced < self.limit:
+                await asyncio.sleep(self.delay)
+                self.produced += 1
+                yield f"{self.produced} "
+        finally:
+            self.closed = True
+
+
+def test_slow_consumer_gets_merged_chunks():
+    async def scenario():
+        upstream = Upstream(limit=20)
+        relayed = coalesce(upstream.chunks())
+        first = await relayed.__anext__()
+        await asyncio.sleep(0.05)
+        rest = await collect(relayed)
+        assert first == "1 "
+        assert len(rest) == 1
+        assert first + ''.join(rest) == ''.join(f"{i} " for i in range(1, 21))
+
+    asyncio.run(scenario())
+
+
+def test_merged_chunks_respect_max_chars():
+    async def scenario():
+        relayed = coalesce(Upstream(limit=20).chunks(), max_chars=6)
+        chunks = [await relayed.__anext__()]
+        await asyncio.sleep(0.05)
+        chunks += await collect(relayed)
+        assert len(chunks) > 2
+        assert all(len(chunk) < 6 + 3 for chunk in chunks)
+        assert ''.join(chunks) == ''.join(f"{i} " for i in range(1, 21))
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_stops_reading_upstream():
+    async def scenario():
+        upstream = Upstream()
+        relayed = coalesce(upstream.chunks(), max_buffered=4)
+        await relayed.__anext__()
+        await asyncio.sleep(0.05)
+        # One delivered, four queued and one held by the blocked pump; nothing more
+        assert upstream.produced == 6
+        await relayed.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_closing_the_relay_closes_the_upstream():
+    async def scenario():
+        upstream = Upstream(delay=0.01)
+        relayed = coalesce(upstream.chunks())
+        await relayed.__anext__()
+        await relayed.aclose()
+        assert upstream.closed
+        produced = upstream.produced
+        await asyncio.sleep(0.05)
+        assert upstream.produced == produced
+
+    asyncio.run(scenario())
+
+
+def test_upstream_errors_reach_the_consumer():
+    async def failing():
+        yield "partial "
+        raise RuntimeError("provider error")
+
+    async def scenario():
+        relayed = coalesce(failing())
+        assert await relayed.__anext__() == "partial "
+        with pytest.raises(RuntimeError):
+            await relayed.__anext__()
+
+    asyncio.run(scenario())
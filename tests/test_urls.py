@@ -0,0 +1,49 @@
+"""URL canonicalization, which keys cached and in-flight analyses."""
+import pytest
+
+from services.urls import canonicalize_url, ensure_scheme
+
+
+@pytest.mark.parametrize('url', [
+    'example.com',
+    'http://example.com',
+    'https://example.com/',
+    'HTTPS://WWW.Example.COM',
+    'https://www.example.com:443/',
+    'http://example.com:80',
+    'https://example.com.',
+    'https://example.com/#pricing',
+    '  example.com  ',
+])
+def test_equivalent_urls_share_a_key(url):
+    assert canonicalize_url(url) == 'https://example.com/'
+
+
+def test_path_keeps_case_and_drops_trailing_slashes():
+    assert canonicalize_url('https://example.com/About/Team//') == 'https://example.com/About/Team'
+
+
+def test_non_default_port_is_kept():
+    assert canonicalize_url('http://www.example.com:8080/') == 'https://example.com:8080/'
+
+
+def test_tracking_params_are_stripped_and_query_sorted():
+    url = 'https://example.com/p?utm_source=x&b=2&gclid=abc&UTM_Medium=y&a=1&fbclid=z&a=0'
+    assert canonicalize_url(url) == 'https://example.com/p?a=0&a=1&b=2'
+
+
+def test_blank_query_values_are_kept():
+    assert canonicalize_url('https://example.com/?q=&utm_campaign=') == 'https://example.com/?q='
+
+
+def test_different_pages_get_different_keys():
+    assert canonicalize_url('example.com/a') != canonicalize_url('example.com/b')
+    assert canonicalize_url('example.com/?page=1') != canonicalize_url('example.com/?page=2')
+
+
+def test_ensure_scheme():
+    assert ensure_scheme(' example.com ') == 'https://example.com'
+    assert ensure_scheme('http://example.com') == 'http://example.com'
+    assert ensure_scheme('HTTP://example.com') == 'HTTP://example.com'
+    # A host that merely starts with "http" still needs a scheme
+    assert ensure_scheme('httpbin.org') == 'https://httpbin.org'